@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Calibration au démarrage du découpage workers x threads du service ASR
+
+Activée par ASR_AUTOTUNE=1. Pour les cœurs réellement alloués au conteneur
+(affinité CPU et quota cgroup), chaque découpage candidat (N workers de
+T threads, N x T <= cœurs) décode un clip de référence en parallèle sur
+tous ses workers. On retient le meilleur débit (secondes d'audio par seconde)
+dont la latence p95 respecte ASR_AUTOTUNE_MAX_LATENCY_MS.
+
+Le clip de référence (ASR_AUTOTUNE_CLIP) doit être de la vraie parole : sur
+un signal synthétique, Whisper ne produit presque aucun token et le coût du
+décodage serait sous-estimé. Sans clip lisible, la calibration est ignorée
+(le découpage des variables d'environnement est conservé).
+
+Le résultat est écrit dans ASR_AUTOTUNE_FILE, indexé par modèle, compute
+type, device et nombre de cœurs : les démarrages suivants le relisent sans
+recalibrer.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+
+from asr_model_manager import SAMPLE_RATE
+from asr_workers import ProcessWorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Configuration de la calibration
+AUTOTUNE_ENABLED = os.getenv('ASR_AUTOTUNE', '0') == '1'
+AUTOTUNE_FILE = os.getenv('ASR_AUTOTUNE_FILE', 'asr_autotune.json')
+AUTOTUNE_MAX_LATENCY_MS = float(os.getenv('ASR_AUTOTUNE_MAX_LATENCY_MS', '2000'))
+AUTOTUNE_ROUNDS = int(os.getenv('ASR_AUTOTUNE_ROUNDS', '3'))
+AUTOTUNE_MAX_WORKERS = int(os.getenv('ASR_AUTOTUNE_MAX_WORKERS', '8'))
+AUTOTUNE_CLIP = os.getenv('ASR_AUTOTUNE_CLIP', '')  # enregistrement de parole ; vide = pas de calibration
+
+DECODE_OPTIONS = dict(language="fr", beam_size=1, best_of=1, temperature=0.0)
+
+
+def available_cores() -> int:
+    """Cœurs utilisables : affinité CPU, bornée par le quota cgroup (v2 puis v1)"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cores = min(cores, max(1, int(quota)))
+    return max(1, cores)
+
+
+def candidate_layouts(cores: int, max_workers: int = AUTOTUNE_MAX_WORKERS) -> list:
+    """(workers, threads) : workers diviseur des cœurs ou puissance de 2, threads = cœurs // workers
+
+    Chaque worker charge sa copie du modèle : le nombre de workers testés est
+    borné par ASR_AUTOTUNE_MAX_WORKERS.
+    """
+    candidates = {w for w in range(1, cores + 1) if cores % w == 0}
+    candidates |= {1 << k for k in range(cores.bit_length()) if 1 << k <= cores}
+    return [(workers, cores // workers) for workers in sorted(candidates) if workers <= max_workers]
+
+
+def reference_clip():
+    """Clip de parole de ASR_AUTOTUNE_CLIP à 16 kHz, ou None s'il est absent ou illisible"""
+    if not AUTOTUNE_CLIP:
+        return None
+    from audio_ingest import AudioDecodeError, decode_to_model_rate
+    try:
+        with open(AUTOTUNE_CLIP, "rb") as f:
+            clip = decode_to_model_rate(f.read())[0]
+    except (OSError, AudioDecodeError) as e:
+        logger.warning(f"⚠️ Clip de calibration illisible ({AUTOTUNE_CLIP}): {e}")
+        return None
+    return clip if len(clip) else None
+
+
+def measure_layout(workers: int, threads: int, model_size: str, device: str, compute_type: str,
+                   clip: np.ndarray, rounds: int = AUTOTUNE_ROUNDS) -> dict:
+    """Débit et latences d'un découpage, tous ses workers occupés en même temps"""
+    pool = ProcessWorkerPool(workers, model_size, device, compute_type, threads)
+    try:
+        # Chauffe : un décodage par worker
+        warmup = [threading.Thread(target=pool.transcribe, args=(clip,), kwargs=DECODE_OPTIONS)
+                  for _ in range(workers)]
+        for thread in warmup:
+            thread.start()
+        for thread in warmup:
+            thread.join()
+
+        latencies = []
+
+        def run():
+            for _ in range(rounds):
+                start = time.perf_counter()
+                pool.transcribe(clip, **DECODE_OPTIONS)
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        threads_list = [threading.Thread(target=run) for _ in range(workers)]
+        for thread in threads_list:
+            thread.start()
+        for thread in threads_list:
+            thread.join()
+        wall = time.perf_counter() - started
+    finally:
+        pool.shutdown(wait=True)
+
+    audio_seconds = len(clip) / SAMPLE_RATE * len(latencies)
+    return {
+        "workers": workers,
+        "threads": threads,
+        "throughput": round(audio_seconds / wall, 3),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1)
+    }
+
+
+def choose_layout(results: list, max_latency_ms: float = AUTOTUNE_MAX_LATENCY_MS) -> dict:
+    """Meilleur débit sous la cible de latence, sinon la latence la plus basse"""
+    eligible = [r for r in results if r["latency_p95_ms"] <= max_latency_ms]
+    if eligible:
+        return max(eligible, key=lambda r: r["throughput"])
+    return min(results, key=lambda r: r["latency_p95_ms"])
+
+
+def _calibration_key(model_size: str, device: str, compute_type: str, cores: int) -> str:
+    return f"{model_size}/{compute_type}/{device}/{cores}"
+
+
+def _load_calibrations() -> dict:
+    try:
+        with open(AUTOTUNE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_calibration(key: str, calibration: dict):
+    calibrations = _load_calibrations()
+    calibrations[key] = calibration
+    directory = os.path.dirname(os.path.abspath(AUTOTUNE_FILE))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{AUTOTUNE_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(calibrations, f, indent=2)
+        os.replace(tmp_path, AUTOTUNE_FILE)
+    except OSError as e:
+        logger.warning(f"⚠️ Calibration non persistée ({AUTOTUNE_FILE}): {e}")
+
+
+def resolve_layout(model_size: str, device: str, compute_type: str) -> dict:
+    """Découpage calibré pour ce modèle : relu depuis le fichier ou mesuré puis persisté
+
+    Retourne {"workers", "threads", "source", ...}, ou None si aucune
+    calibration n'est connue et qu'aucun clip de parole n'est disponible.
+    """
+    cores = available_cores()
+    key = _calibration_key(model_size, device, compute_type, cores)
+    calibration = _load_calibrations().get(key)
+    if calibration:
+        logger.info(f"🎛️ Calibration ASR relue ({key}): {calibration['workers']} workers x "
+                    f"{calibration['threads']} threads")
+        return dict(calibration["chosen"], source="autotune_cache")
+
+    clip = reference_clip()
+    if clip is None:
+        logger.warning(f"⚠️ Calibration ASR ignorée pour {key} : ASR_AUTOTUNE_CLIP doit désigner "
+                       f"un enregistrement de parole")
+        return None
+    logger.info(f"🎛️ Calibration ASR pour {key} ({len(candidate_layouts(cores))} découpages)...")
+    results = []
+    for workers, threads in candidate_layouts(cores):
+        try:
+            result = measure_layout(workers, threads, model_size, device, compute_type, clip)
+        except Exception as e:
+            logger.warning(f"⚠️ Découpage {workers}x{threads} en échec: {e}")
+            continue
+        logger.info(f"   {workers} workers x {threads} threads: {result['throughput']:.2f} s audio/s, "
+                    f"p95 {result['latency_p95_ms']:.0f} ms")
+        results.append(result)
+    if not results:
+        raise RuntimeError("Calibration ASR impossible : aucun découpage n'a abouti")
+
+    chosen = choose_layout(results)
+    _save_calibration(key, {
+        "workers": chosen["workers"],
+        "threads": chosen["threads"],
+        "chosen": chosen,
+        "results": results,
+        "max_latency_ms": AUTOTUNE_MAX_LATENCY_MS,
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    })
+    logger.info(f"✅ Découpage ASR retenu: {chosen['workers']} workers x {chosen['threads']} threads")
+    return dict(chosen, source="autotune")
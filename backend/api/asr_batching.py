@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Ordonnanceur de micro-lots pour le service ASR Faster-Whisper
+
+Les requêtes qui arrivent dans une même fenêtre (ASR_BATCH_WINDOW_MS) sont
+regroupées et décodées en un seul passage encodeur/décodeur CTranslate2 ;
+chaque appelant reçoit son propre résultat. Les clips de plus de 30 s (une
+fenêtre Whisper) sont décodés individuellement avec `transcribe`.
+"""
+import os
+import time
+import queue
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+MAX_BATCHED_SECONDS = 30.0
+
+# Configuration du micro-batching
+BATCH_WINDOW_MS = float(os.getenv('ASR_BATCH_WINDOW_MS', '30'))
+BATCH_MAX_SIZE = int(os.getenv('ASR_BATCH_MAX_SIZE', '8'))
+
+
+def segments_to_result(segments, info) -> dict:
+    """Matérialise les segments Faster-Whisper en réponse JSON
+
+    avg_logprob est pondéré par le nombre de tokens, no_speech_prob est le
+    maximum sur les segments ; ces deux valeurs alimentent la politique de
+    décodage. `segments` garde les horodatages de chaque segment (et de ses
+    mots si word_timestamps est demandé), relatifs à l'audio décodé.
+    """
+    texts = []
+    timed = []
+    logprob_sum = 0.0
+    token_count = 0
+    no_speech_prob = 0.0
+    for segment in segments:
+        texts.append(segment.text.strip())
+        timed.append(segment_timestamps(segment))
+        tokens = max(len(getattr(segment, "tokens", None) or []), 1)
+        logprob_sum += segment.avg_logprob * tokens
+        token_count += tokens
+        no_speech_prob = max(no_speech_prob, segment.no_speech_prob)
+    return {
+        "text": " ".join(texts).strip(),
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "duration": info.duration,
+        "avg_logprob": logprob_sum / token_count if token_count else 0.0,
+        "no_speech_prob": no_speech_prob,
+        "segments": timed
+    }
+
+
+def segment_timestamps(segment) -> dict:
+    timed = {"start": round(segment.start, 3), "end": round(segment.end, 3), "text": segment.text.strip()}
+    words = getattr(segment, "words", None)
+    if words:
+        timed["words"] = [
+            {"word": word.word, "start": round(word.start, 3), "end": round(word.end, 3),
+             "probability": round(word.probability, 4)}
+            for word in words
+        ]
+    return timed
+
+
+class TranscriptionRequest:
+    """Requête en attente dans l'ordonnanceur"""
+
+    def __init__(self, audio: np.ndarray, options: dict):
+        self.audio = audio
+        self.options = options
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def batch_key(self):
+        """Seules les requêtes aux options de décodage identiques partagent un lot"""
+        return tuple(sorted(self.options.items()))
+
+    @property
+    def batchable(self) -> bool:
+        return len(self.audio) <= MAX_BATCHED_SECONDS * SAMPLE_RATE
+
+
+class BatchStats:
+    """Statistiques de file d'attente et de taille de lot (fenêtre glissante)"""
+
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self.queue_waits_ms = deque(maxlen=history)
+        self.batch_sizes = deque(maxlen=history)
+        self.requests = 0
+        self.batches = 0
+        self.fallbacks = 0
+
+    def record_batch(self, waits_ms, size: int):
+        with self._lock:
+            self.queue_waits_ms.extend(waits_ms)
+            self.batch_sizes.append(size)
+            self.requests += size
+            self.batches += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = np.array(self.queue_waits_ms) if self.queue_waits_ms else np.zeros(1)
+            sizes = np.array(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+            histogram = {}
+            for size in self.batch_sizes:
+                histogram[str(size)] = histogram.get(str(size), 0) + 1
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "fallbacks": self.fallbacks,
+                "queue_wait_ms": {
+                    "avg": round(float(waits.mean()), 2),
+                    "p50": round(float(np.percentile(waits, 50)), 2),
+                    "p95": round(float(np.percentile(waits, 95)), 2),
+                    "max": round(float(waits.max()), 2)
+                },
+                "batch_size": {
+                    "avg": round(float(sizes.mean()), 2),
+                    "max": int(sizes.max()),
+                    "histogram": histogram
+                }
+            }
+
+
+class MicroBatchScheduler:
+    """Regroupe les transcriptions concurrentes en lots décodés ensemble"""
+
+    def __init__(self, model, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = BATCH_MAX_SIZE):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.stats = BatchStats()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+        self._thread.start()
+
+    def transcribe(self, audio: np.ndarray, **options) -> dict:
+        """Soumet un clip 16 kHz float32 et attend son résultat"""
+        request = TranscriptionRequest(audio, options)
+        self._queue.put(request)
+        return request.future.result()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self):
+        """Arrête le thread après les requêtes déjà en file"""
+        self._queue.put(None)
+
+    def _collect(self):
+        """Attend une première requête puis regroupe celles de la fenêtre
+
+        Retourne (lot, arrêt demandé).
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                break
+            started = time.perf_counter()
+            self.stats.record_batch([(started - r.enqueued_at) * 1000 for r in batch], len(batch))
+
+            groups = {}
+            for request in batch:
+                if request.batchable:
+                    groups.setdefault(request.batch_key, []).append(request)
+                else:
+                    self._transcribe_single(request)
+
+            for requests in groups.values():
+                if len(requests) == 1:
+                    self._transcribe_single(requests[0])
+                    continue
+                try:
+                    results = self._decode_batch(requests)
+                except Exception as e:
+                    logger.warning(f"⚠️ Lot de {len(requests)} requêtes en échec, décodage individuel: {e}")
+                    self.stats.fallbacks += 1
+                    for request in requests:
+                        self._transcribe_single(request)
+                    continue
+                for request, result in zip(requests, results):
+                    result["batch_size"] = len(requests)
+                    request.future.set_result(result)
+
+    def _transcribe_single(self, request: TranscriptionRequest):
+        try:
+            segments, info = self.model.transcribe(request.audio, **request.options)
+            result = segments_to_result(segments, info)
+            result["batch_size"] = 1
+            request.future.set_result(result)
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def _decode_batch(self, requests):
+        """Un passage encodeur + décodeur CTranslate2 pour tout le lot"""
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.transcribe import get_suppressed_tokens
+
+        options = requests[0].options
+        language = options.get("language") or "fr"
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            self.model.model.is_multilingual,
+            task="transcribe",
+            language=language
+        )
+
+        features = np.stack([
+            pad_or_trim(self.model.feature_extractor(request.audio))
+            for request in requests
+        ])
+        encoder_output = self.model.encode(features)
+
+        prompt = self.model.get_prompt(tokenizer, [], without_timestamps=True)
+        results = self.model.model.generate(
+            encoder_output,
+            [list(prompt) for _ in requests],
+            beam_size=options.get("beam_size", 5),
+            max_length=self.model.max_length,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+            return_scores=True,
+            return_no_speech_prob=True
+        )
+
+        outputs = []
+        for request, result in zip(requests, results):
+            seq_len = len(result.sequences_ids[0])
+            tokens = [t for t in result.sequences_ids[0] if t < tokenizer.eot]
+            text = tokenizer.decode(tokens).strip()
+            duration = len(request.audio) / SAMPLE_RATE
+            outputs.append({
+                "text": text,
+                "language": language,
+                "language_probability": 1.0,
+                "duration": duration,
+                "avg_logprob": result.scores[0] * seq_len / (seq_len + 1),
+                "no_speech_prob": result.no_speech_prob,
+                # Décodage sans horodatages : un segment couvrant le clip
+                "segments": [{"start": 0.0, "end": round(duration, 3), "text": text}] if text else []
+            })
+        return outputs
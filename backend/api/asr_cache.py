@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Cache de transcriptions adressé par contenu pour le service ASR
+
+La clé est un hash BLAKE2 du PCM normalisé (16 kHz mono, quantifié en
+int16) et des paramètres de décodage : un même audio renvoyé par un test,
+une relance client ou une reconnexion d'agent n'est décodé qu'une fois.
+Les requêtes identiques concurrentes sont regroupées en un seul décodage
+(single-flight). Le cache est un LRU borné en nombre d'entrées et en mémoire.
+"""
+import os
+import sys
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+
+# Configuration du cache
+CACHE_MAX_ENTRIES = int(os.getenv('ASR_CACHE_MAX_ENTRIES', '2048'))
+CACHE_MAX_BYTES = int(os.getenv('ASR_CACHE_MAX_MB', '32')) * 1024 * 1024
+
+
+def audio_fingerprint(audio: np.ndarray, params: tuple) -> str:
+    """Hash du PCM normalisé et des paramètres de décodage"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(params).encode())
+    pcm = np.clip(audio, -1.0, 1.0) * 32767.0
+    digest.update(pcm.astype(np.int16).tobytes())
+    return digest.hexdigest()
+
+
+def _result_size(result: dict) -> int:
+    size = sys.getsizeof(result)
+    for key, value in result.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class TranscriptionCache:
+    """LRU borné + regroupement des décodages identiques en vol"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get_or_compute(self, key: str, compute) -> dict:
+        """Retourne le résultat en cache, attend un décodage identique en vol, ou calcule"""
+        if not self.enabled:
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(copy.deepcopy(entry[0]), cached=True)
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                leader = True
+
+        if not leader:
+            return dict(copy.deepcopy(future.result()), cached=True)
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        # Copie privée, jamais modifiée : partagée par le cache et les requêtes regroupées ;
+        # `result` reste à l'appelant, qui peut le compléter (input_sample_rate, ...)
+        shared = copy.deepcopy(result)
+        with self._lock:
+            del self._in_flight[key]
+            self._store(key, shared)
+        future.set_result(shared)
+        return result
+
+    def _store(self, key: str, result: dict):
+        size = _result_size(result) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (result, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "in_flight": len(self._in_flight)
+            }
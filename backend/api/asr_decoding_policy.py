@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Politique de décodage adaptative pour le service ASR
+
+Échelons (« rungs ») rapportés dans chaque réponse (`decode_policy`) :
+- greedy           : décodage glouton (beam_size=1), cas nominal
+- beam_escalated   : greedy jugé peu fiable (avg_logprob trop bas ou
+                     no_speech_prob trop haut), redécodé en beam search
+- greedy_degraded  : file d'attente >= ASR_POLICY_DEGRADE_QUEUE, greedy sans escalade
+- fallback_model   : file d'attente >= ASR_POLICY_FALLBACK_QUEUE, modèle de
+                     secours plus petit (ASR_FALLBACK_MODEL) en greedy
+"""
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration de la politique
+POLICY_ENABLED = os.getenv('ASR_ADAPTIVE_DECODING', '1') == '1'
+POLICY_MIN_AVG_LOGPROB = float(os.getenv('ASR_POLICY_MIN_AVG_LOGPROB', '-0.8'))
+POLICY_MAX_NO_SPEECH_PROB = float(os.getenv('ASR_POLICY_MAX_NO_SPEECH_PROB', '0.6'))
+POLICY_DEGRADE_QUEUE = int(os.getenv('ASR_POLICY_DEGRADE_QUEUE', '4'))
+POLICY_FALLBACK_QUEUE = int(os.getenv('ASR_POLICY_FALLBACK_QUEUE', '10'))
+FALLBACK_MODEL_SIZE = os.getenv('ASR_FALLBACK_MODEL', '')
+
+BASE_OPTIONS = dict(language="fr", temperature=0.0)
+GREEDY_OPTIONS = dict(BASE_OPTIONS, beam_size=1, best_of=1)
+BEAM_OPTIONS = dict(BASE_OPTIONS, beam_size=5, best_of=5)
+
+RUNGS = ("greedy", "beam_escalated", "greedy_degraded", "fallback_model", "beam")
+
+
+class DecodingPolicy:
+    """Choisit les paramètres de décodage selon la confiance et la charge
+
+    `decode(audio, **options)` et `fallback_decode` renvoient un dict
+    contenant au moins text, avg_logprob et no_speech_prob ;
+    `fallback_ready()` indique si le modèle de secours est utilisable.
+    """
+
+    def __init__(self, fallback_decode=None, fallback_ready=None, enabled: bool = POLICY_ENABLED):
+        self.fallback_decode = fallback_decode
+        self.fallback_ready = fallback_ready or (lambda: fallback_decode is not None)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(RUNGS, 0)
+
+    def needs_escalation(self, result: dict) -> bool:
+        if not result.get("text"):
+            return False
+        return (result.get("avg_logprob", 0.0) < POLICY_MIN_AVG_LOGPROB
+                or result.get("no_speech_prob", 0.0) > POLICY_MAX_NO_SPEECH_PROB)
+
+    def transcribe(self, audio, decode, queue_depth: int = 0) -> dict:
+        if not self.enabled:
+            rung, result = "beam", decode(audio, **BEAM_OPTIONS)
+        elif queue_depth >= POLICY_FALLBACK_QUEUE and self.fallback_ready():
+            rung, result = "fallback_model", self.fallback_decode(audio, **GREEDY_OPTIONS)
+        elif queue_depth >= POLICY_DEGRADE_QUEUE:
+            rung, result = "greedy_degraded", decode(audio, **GREEDY_OPTIONS)
+        else:
+            rung, result = "greedy", decode(audio, **GREEDY_OPTIONS)
+            if self.needs_escalation(result):
+                logger.info(f"🔁 Confiance faible (avg_logprob={result.get('avg_logprob', 0):.2f}, "
+                            f"no_speech_prob={result.get('no_speech_prob', 0):.2f}), redécodage en beam search")
+                rung, result = "beam_escalated", decode(audio, **BEAM_OPTIONS)
+
+        with self._lock:
+            self.counts[rung] += 1
+        result["decode_policy"] = rung
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "enabled": self.enabled,
+            "fallback_model": FALLBACK_MODEL_SIZE or None,
+            "min_avg_logprob": POLICY_MIN_AVG_LOGPROB,
+            "max_no_speech_prob": POLICY_MAX_NO_SPEECH_PROB,
+            "degrade_queue_depth": POLICY_DEGRADE_QUEUE,
+            "fallback_queue_depth": POLICY_FALLBACK_QUEUE,
+            "rungs": counts
+        }
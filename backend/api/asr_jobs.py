@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Transcription asynchrone des enregistrements longs
+
+Un job reçoit un fichier complet, le décode par blocs vers du PCM 16 kHz
+int16 écrit dans un fichier de spool (jamais le signal entier en mémoire),
+puis le découpe aux pauses détectées par la VAD en morceaux d'au plus
+ASR_JOB_CHUNK_MAX_SECONDS. Les morceaux sont transcrits en parallèle sur les
+décodeurs disponibles (au plus `parallelism` morceaux en vol par job) et les
+segments sont recollés avec leurs horodatages absolus. Chaque morceau
+réserve son propre décodeur avec la priorité du job (batch par défaut) :
+les requêtes interactives passent entre deux morceaux.
+
+États d'un job : queued -> running -> done | failed.
+"""
+import os
+import time
+import uuid
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from audio_ingest import AudioDecodeError, PCM16_SCALE, TARGET_SAMPLE_RATE, open_audio
+from audio_resample import StreamResampler
+from asr_vad import detect_speech, restore_timestamps, trim_to_speech
+from asr_workers import PRIORITY_BATCH, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+# Configuration des jobs
+JOB_CHUNK_MAX_SECONDS = float(os.getenv('ASR_JOB_CHUNK_MAX_SECONDS', '28'))
+JOB_CHUNK_MIN_SECONDS = float(os.getenv('ASR_JOB_CHUNK_MIN_SECONDS', '8'))
+JOB_MAX_SECONDS = float(os.getenv('ASR_JOB_MAX_SECONDS', '7200'))
+JOB_MAX_ACTIVE = int(os.getenv('ASR_JOB_MAX_ACTIVE', '2'))
+JOB_MAX_JOBS = int(os.getenv('ASR_JOB_MAX_JOBS', '100'))
+JOB_TTL_SECONDS = float(os.getenv('ASR_JOB_TTL_SECONDS', '3600'))
+JOB_SPOOL_DIR = os.getenv('ASR_JOB_SPOOL_DIR') or None
+
+
+def spool_upload(fileobj, spool) -> float:
+    """Décode `fileobj` par blocs, rééchantillonne à 16 kHz et écrit du int16 dans `spool`
+
+    Retourne la durée (s). La mémoire utilisée ne dépend que de la taille de bloc.
+    """
+    written = 0
+    max_samples = int(JOB_MAX_SECONDS * TARGET_SAMPLE_RATE)
+
+    def write(block: np.ndarray):
+        nonlocal written
+        if written + len(block) > max_samples:
+            raise AudioDecodeError(f"Enregistrement trop long (max {JOB_MAX_SECONDS:.0f} s)")
+        np.clip(block * 32768.0, -32768, 32767).astype(np.int16).tofile(spool)
+        written += len(block)
+
+    with open_audio(fileobj) as (sample_rate, blocks):
+        resampler = StreamResampler(int(sample_rate))
+        for block in blocks:
+            write(resampler.process(block))
+        write(resampler.flush())
+    spool.flush()
+    return written / TARGET_SAMPLE_RATE
+
+
+def read_spool(path: str, start: int, count: int) -> np.ndarray:
+    """Fenêtre [start, start + count) du spool en float32"""
+    samples = np.fromfile(path, dtype=np.int16, count=count, offset=start * 2)
+    audio = np.empty(len(samples), dtype=np.float32)
+    np.multiply(samples, PCM16_SCALE, out=audio, casting='unsafe')
+    return audio
+
+
+def split_at_pause(regions: list, window_len: int, final: bool) -> int:
+    """Point de coupe (échantillons) dans une fenêtre : milieu de la dernière pause
+
+    Si la fenêtre finit sur du silence, ou sans pause exploitable après
+    JOB_CHUNK_MIN_SECONDS, coupe en fin de fenêtre.
+    """
+    if final or not regions or regions[-1][1] < window_len:
+        return window_len
+    min_cut = int(JOB_CHUNK_MIN_SECONDS * TARGET_SAMPLE_RATE)
+    for i in range(len(regions) - 1, 0, -1):
+        previous_end, next_start = regions[i - 1][1], regions[i][0]
+        cut = (previous_end + next_start) // 2
+        if previous_end < next_start and cut >= min_cut:
+            return cut
+    return window_len
+
+
+def iter_chunks(read, total_samples: int):
+    """Morceaux (début en échantillons, audio de parole, [début, fin] en s, zones de parole) coupés aux pauses
+
+    `read(start, count)` renvoie la fenêtre [start, start + count) en float32.
+    Les zones sont relatives au début du morceau : avec lui, elles replacent
+    les horodatages décodés dans l'enregistrement (`chunk_segments`).
+    """
+    window_samples = int(JOB_CHUNK_MAX_SECONDS * TARGET_SAMPLE_RATE)
+    position = 0
+    while position < total_samples:
+        window = read(position, window_samples)
+        final = position + len(window) >= total_samples
+        regions = detect_speech(window)
+        cut = split_at_pause(regions, len(window), final)
+        regions = [(start, min(end, cut)) for start, end in regions if start < cut]
+        if regions:
+            span = [round((position + regions[0][0]) / TARGET_SAMPLE_RATE, 3),
+                    round((position + regions[-1][1]) / TARGET_SAMPLE_RATE, 3)]
+            yield position, trim_to_speech(window[:cut], regions), span, regions
+        position += cut
+
+
+def chunk_segments(result: dict, position: int, regions: list) -> list:
+    """Segments d'un morceau décodé, horodatés en secondes depuis le début de l'enregistrement"""
+    return restore_timestamps(result.get("segments", []), regions, position)
+
+
+class TranscriptionJob:
+    """Job de transcription longue et son avancement"""
+
+    def __init__(self, spool_path: str, duration: float, filename: str = None, priority: str = PRIORITY_BATCH):
+        self.job_id = uuid.uuid4().hex
+        self.spool_path = spool_path
+        self.duration = duration
+        self.filename = filename
+        self.priority = priority
+        self.state = "queued"
+        self.error = None
+        self.segments = {}
+        self.processed_seconds = 0.0
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cond = threading.Condition()
+        self.version = 0
+
+    def _update(self, **fields):
+        with self.cond:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.cond.notify_all()
+
+    def add_segment(self, index: int, segment: dict, end_seconds: float):
+        with self.cond:
+            self.segments[index] = segment
+            self.processed_seconds = max(self.processed_seconds, end_seconds)
+            self.version += 1
+            self.cond.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        with self.cond:
+            if self.version == version and not self.finished:
+                self.cond.wait(timeout)
+            return self.version
+
+    def status(self, include_result: bool = True) -> dict:
+        with self.cond:
+            segments = [self.segments[i] for i in sorted(self.segments)]
+            status = {
+                "job_id": self.job_id,
+                "state": self.state,
+                "filename": self.filename,
+                "priority": self.priority,
+                "duration": round(self.duration, 3),
+                "progress": round(min(1.0, self.processed_seconds / self.duration), 3) if self.duration else 1.0,
+                "segments_done": len(segments),
+            }
+            if self.error:
+                status["error"] = self.error
+            if include_result and self.state == "done":
+                status["result"] = {
+                    "text": " ".join(s["text"] for s in segments if s["text"]).strip(),
+                    "language": "fr",
+                    "duration": round(self.duration, 3),
+                    "segments": segments
+                }
+            return status
+
+
+class JobManager:
+    """File des jobs longs ; chaque job décode ses morceaux via `transcribe(audio, priority)`
+
+    `parallelism` est un entier ou une fonction (capacité d'admission courante),
+    relue au démarrage de chaque job : un changement de modèle ou de découpage
+    s'applique aux jobs suivants.
+    """
+
+    def __init__(self, transcribe, parallelism, max_active: int = JOB_MAX_ACTIVE,
+                 max_jobs: int = JOB_MAX_JOBS, ttl: float = JOB_TTL_SECONDS):
+        self.transcribe = transcribe
+        self._parallelism = parallelism if callable(parallelism) else (lambda: parallelism)
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=max(1, max_active), thread_name_prefix="asr-job")
+
+    @property
+    def parallelism(self) -> int:
+        return max(1, int(self._parallelism()))
+
+    def submit(self, fileobj, filename: str = None, priority: str = PRIORITY_BATCH) -> TranscriptionJob:
+        """Spoole l'audio puis met le job en file ; AudioDecodeError si illisible"""
+        self._expire()
+        with self._lock:
+            if len(self._jobs) >= self.max_jobs:
+                raise RuntimeError("Too many transcription jobs")
+
+        fd, spool_path = tempfile.mkstemp(prefix="asr-job-", suffix=".pcm", dir=JOB_SPOOL_DIR)
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                duration = spool_upload(fileobj, spool)
+        except Exception:
+            os.unlink(spool_path)
+            raise
+
+        job = TranscriptionJob(spool_path, duration, filename, priority)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._runner.submit(self._run, job)
+        logger.info(f"🗂️ Job {job.job_id} en file ({duration:.1f} s d'audio)")
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _transcribe_chunk(self, audio: np.ndarray, priority: str) -> dict:
+        while True:
+            try:
+                return self.transcribe(audio, priority=priority)
+            except QueueFullError as e:
+                # Les jobs ne sont pas rejetés : ils attendent que la file se vide
+                time.sleep(e.retry_after)
+
+    def _run(self, job: TranscriptionJob):
+        job._update(state="running")
+        started = time.perf_counter()
+        parallelism = self.parallelism
+        in_flight = threading.BoundedSemaphore(parallelism)
+        chunk_pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="asr-job-chunk")
+        aborted = threading.Event()
+        futures = []
+        try:
+            total_samples = os.path.getsize(job.spool_path) // 2
+            chunks = iter_chunks(lambda start, count: read_spool(job.spool_path, start, count), total_samples)
+            for index, (position, audio, span, regions) in enumerate(chunks):
+                # Au plus `parallelism` morceaux en mémoire pour ce job
+                in_flight.acquire()
+                if aborted.is_set():
+                    in_flight.release()
+                    break
+                future = chunk_pool.submit(self._transcribe_chunk, audio, job.priority)
+                future.add_done_callback(
+                    lambda f, i=index, sp=span, p=position, r=regions:
+                    self._chunk_done(job, f, i, sp, p, r, in_flight, aborted))
+                futures.append(future)
+            for future in futures:
+                future.result()
+        except Exception as e:
+            logger.error(f"❌ Job {job.job_id} en échec: {e}", exc_info=True)
+            for future in futures:
+                future.cancel()
+            job._update(state="failed", error=str(e), finished_at=time.time())
+        else:
+            elapsed = time.perf_counter() - started
+            logger.info(f"✅ Job {job.job_id} terminé: {len(futures)} morceaux en {elapsed:.1f} s "
+                        f"(RTF {elapsed / job.duration if job.duration else 0:.3f})")
+            job._update(state="done", processed_seconds=job.duration, finished_at=time.time())
+        finally:
+            chunk_pool.shutdown(wait=False)
+            try:
+                os.unlink(job.spool_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _chunk_done(job: TranscriptionJob, future, index: int, span: list, position: int, regions: list,
+                    in_flight, aborted):
+        in_flight.release()
+        if future.cancelled() or future.exception() is not None:
+            aborted.set()
+            return
+        result = future.result()
+        job.add_segment(index, {
+            "start": span[0],
+            "end": span[1],
+            "text": result["text"],
+            "decode_policy": result.get("decode_policy"),
+            "segments": chunk_segments(result, position, regions)
+        }, span[1])
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished and now - job.finished_at > self.ttl:
+                    del self._jobs[job_id]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "jobs": len(jobs),
+            "queued": sum(job.state == "queued" for job in jobs),
+            "running": sum(job.state == "running" for job in jobs),
+            "parallelism": self.parallelism
+        }
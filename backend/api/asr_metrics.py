@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Métriques Prometheus du service ASR
+
+Histogrammes par étape (upload/décodage audio, durée audio, attente en
+file, décodage modèle, facteur temps réel) et compteurs (requêtes,
+rejets, transcriptions vides, erreurs), étiquetés par endpoint et par
+échelon de politique de décodage.
+
+L'enregistrement ne prend aucun verrou global : chaque thread écrit dans
+son propre fragment (threading.local), les fragments ne sont agrégés qu'au
+moment du scrape. Les fragments des threads terminés sont fusionnés dans
+un fragment de base pour que leur nombre reste borné.
+"""
+import math
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DURATION_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+HISTOGRAMS = {
+    "asr_upload_decode_seconds": ("Lecture de la requête et décodage audio jusqu'au PCM 16 kHz", LATENCY_BUCKETS),
+    "asr_audio_duration_seconds": ("Durée de l'audio reçu", DURATION_BUCKETS),
+    "asr_queue_wait_seconds": ("Attente dans la file d'admission", LATENCY_BUCKETS),
+    "asr_model_decode_seconds": ("Décodage Whisper (toutes passes de la politique)", LATENCY_BUCKETS),
+    "asr_real_time_factor": ("Temps de décodage / durée audio", RTF_BUCKETS),
+}
+
+COUNTERS = {
+    "asr_requests_total": "Requêtes de transcription traitées",
+    "asr_requests_rejected_total": "Requêtes rejetées (file pleine, modèle non prêt)",
+    "asr_requests_empty_total": "Transcriptions vides (VAD ou Whisper)",
+    "asr_requests_errors_total": "Requêtes en erreur",
+}
+
+
+class _Shard:
+    """Données d'un thread : un seul écrivain, donc aucun verrou"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def merge_into(self, other: "_Shard"):
+        for key, (buckets, total, count) in self.histograms.items():
+            target = other.histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            target[0] = [a + b for a, b in zip(target[0], buckets)]
+            target[1] += total
+            target[2] += count
+        for key, value in self.counters.items():
+            other.counters[key] = other.counters.get(key, 0) + value
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = ('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Registre sans verrou sur le chemin d'enregistrement"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []  # (thread, fragment)
+        self._base = _Shard()
+        self._registry_lock = threading.Lock()  # création de fragment et scrape uniquement
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._registry_lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, _label_key(labels))
+        histograms = self._shard().histograms
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def inc(self, name: str, amount: int = 1, **labels):
+        counters = self._shard().counters
+        key = (name, _label_key(labels))
+        counters[key] = counters.get(key, 0) + amount
+
+    def _collect(self) -> _Shard:
+        with self._registry_lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    shard.merge_into(self._base)
+            self._shards = alive
+            total = _Shard()
+            self._base.merge_into(total)
+            for _, shard in alive:
+                # Copie superficielle : l'écrivain peut ajouter une clé pendant la lecture
+                snapshot = _Shard()
+                snapshot.histograms = {k: [list(v[0]), v[1], v[2]] for k, v in list(shard.histograms.items())}
+                snapshot.counters = dict(list(shard.counters.items()))
+                snapshot.merge_into(total)
+            return total
+
+    def render(self, gauges=()) -> str:
+        """Format texte Prometheus ; `gauges` : [(nom, aide, valeur, labels)]"""
+        data = self._collect()
+        lines = []
+
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, label_key), (counts, total, count) in sorted(data.histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + [math.inf], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(label_key, (('le', _format_value(bound)),))} "
+                                 f"{cumulative}")
+                lines.append(f"{name}_sum{_format_labels(label_key)} {total}")
+                lines.append(f"{name}_count{_format_labels(label_key)} {count}")
+
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, label_key), value in sorted(data.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(label_key)} {value}")
+
+        seen = set()
+        for name, help_text, value, labels in gauges:
+            if name not in seen:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(_label_key(labels or {}))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
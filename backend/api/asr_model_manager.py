@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Cycle de vie du modèle Whisper pour le service ASR
+
+- chargement en arrière-plan : le processus répond à /health pendant que le
+  modèle se charge, /ready ne passe à 200 qu'une fois le modèle chauffé
+- chauffe (warm-up) sur un clip synthétique pour payer l'initialisation des
+  noyaux et de l'allocateur avant la première vraie requête
+- remplacement à chaud : un nouveau modèle (taille ou compute type différents)
+  est chargé et chauffé à côté de l'actuel, puis publié atomiquement ; les
+  requêtes en cours terminent sur l'ancien modèle
+"""
+import time
+import threading
+import logging
+from contextlib import contextmanager
+import numpy as np
+
+from asr_batching import segments_to_result
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class ModelNotReadyError(RuntimeError):
+    """Aucun modèle chargé et chauffé pour le moment"""
+
+
+def synthetic_clip(seconds: float = 2.0) -> np.ndarray:
+    """Clip de chauffe : harmoniques modulées façon voyelles + léger bruit"""
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    pitch = 140.0 + 20.0 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t) ** 2
+    clip = 0.1 * voice * envelope + 0.003 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+class ModelHandle:
+    """Un modèle chargé (WhisperModel ou pool de workers) et son ordonnanceur"""
+
+    def __init__(self, model, model_size: str, compute_type: str, batch_scheduler=None, workers: int = 1,
+                 layout: dict = None):
+        self.model = model
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.batch_scheduler = batch_scheduler
+        self.workers = workers
+        # Découpage workers x threads du modèle, appliqué au service à sa publication
+        self.layout = layout
+        self.loaded_at = time.time()
+        self.inflight = 0
+        self._cond = threading.Condition()
+
+    def decode(self, audio: np.ndarray, **options) -> dict:
+        """Un décodage avec les options données, via l'ordonnanceur de lots si actif"""
+        if self.batch_scheduler:
+            return self.batch_scheduler.transcribe(audio, **options)
+        segments, info = self.model.transcribe(audio, **options)
+        # Les segments sont un générateur : le décodage a lieu pendant l'itération
+        return segments_to_result(segments, info)
+
+    def warm_up(self):
+        """Décodages greedy et beam sur chaque worker"""
+        clip = synthetic_clip()
+
+        def run():
+            for beam_size in (1, 5):
+                segments, _ = self.model.transcribe(clip, language="fr", beam_size=beam_size, temperature=0.0)
+                list(segments)
+
+        threads = [threading.Thread(target=run) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        """Libère le modèle : arrêt des processus workers, ou déchargement des poids CTranslate2"""
+        shutdown = getattr(self.model, "shutdown", None)
+        if shutdown is not None:
+            # ProcessWorkerPool : les processus (un modèle complet chacun) sont attendus
+            shutdown(wait=True)
+            return
+        # WhisperModel (répliques partagées comprises) : poids et threads des répliques
+        unload = getattr(getattr(self.model, "model", None), "unload_model", None)
+        if unload is not None:
+            unload()
+
+    def retire(self):
+        """Attend la fin des requêtes en cours puis libère l'ordonnanceur et le modèle"""
+        with self._cond:
+            while self.inflight:
+                self._cond.wait()
+        if self.batch_scheduler:
+            self.batch_scheduler.stop()
+        try:
+            self.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Libération du modèle {self.model_size}/{self.compute_type} incomplète: {e}")
+        logger.info(f"♻️ Ancien modèle {self.model_size}/{self.compute_type} libéré")
+
+
+class ModelManager:
+    """Chargement en arrière-plan, chauffe et remplacement atomique du modèle
+
+    `factory(model_size, compute_type)` construit un ModelHandle ; `on_publish(handle)`
+    est appelé au moment où un modèle chauffé devient le modèle courant (jamais
+    pour un modèle en chargement ou en échec), pour y aligner la configuration
+    du service (découpage, capacité d'admission).
+    """
+
+    def __init__(self, factory, model_size: str, compute_type: str, name: str = "principal",
+                 on_publish=None):
+        self.factory = factory
+        self.on_publish = on_publish
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.name = name
+        self.current = None
+        self.state = "idle"
+        self.error = None
+        self.swap = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.current is not None
+
+    def start(self):
+        """Charge le modèle initial en arrière-plan"""
+        self.state = "loading"
+        threading.Thread(target=self._load, args=(self.model_size, self.compute_type, self._set_state),
+                         name=f"asr-model-{self.name}", daemon=True).start()
+
+    def _set_state(self, state: str, error: str = None):
+        self.state = state
+        self.error = error
+
+    def _set_swap_state(self, state: str, error: str = None):
+        self.swap.update(state=state, error=error, updated_at=time.time())
+
+    def _load(self, model_size: str, compute_type: str, report):
+        started = time.time()
+        try:
+            report("loading")
+            logger.info(f"⏳ Chargement du modèle {self.name}: {model_size}/{compute_type}")
+            handle = self.factory(model_size, compute_type)
+            report("warming")
+            handle.warm_up()
+        except Exception as e:
+            logger.error(f"❌ Erreur lors du chargement du modèle {model_size}: {e}", exc_info=True)
+            report("error", str(e))
+            return
+
+        with self._lock:
+            previous, self.current = self.current, handle
+            self.model_size, self.compute_type = model_size, compute_type
+            if self.on_publish:
+                self.on_publish(handle)
+        report("ready")
+        logger.info(f"✅ Modèle {self.name} {model_size}/{compute_type} prêt en {time.time() - started:.1f}s")
+        if previous is not None:
+            threading.Thread(target=previous.retire, daemon=True).start()
+
+    def request_swap(self, model_size: str, compute_type: str) -> dict:
+        """Démarre le chargement d'un nouveau modèle à côté de l'actuel"""
+        with self._lock:
+            if self.swap and self.swap["state"] in ("loading", "warming"):
+                raise RuntimeError("Un remplacement de modèle est déjà en cours")
+            self.swap = {"model_size": model_size, "compute_type": compute_type,
+                         "state": "loading", "error": None, "updated_at": time.time()}
+        threading.Thread(target=self._load, args=(model_size, compute_type, self._set_swap_state),
+                         name=f"asr-model-swap-{self.name}", daemon=True).start()
+        return dict(self.swap)
+
+    @contextmanager
+    def acquire(self):
+        """Réserve le modèle courant pour la durée d'une requête"""
+        with self._lock:
+            handle = self.current
+            if handle is None:
+                raise ModelNotReadyError(f"Modèle {self.name} en cours de chargement ({self.state})")
+            with handle._cond:
+                handle.inflight += 1
+        try:
+            yield handle
+        finally:
+            with handle._cond:
+                handle.inflight -= 1
+                handle._cond.notify_all()
+
+    def status(self) -> dict:
+        handle = self.current
+        return {
+            "state": self.state,
+            "error": self.error,
+            "model_size": handle.model_size if handle else self.model_size,
+            "compute_type": handle.compute_type if handle else self.compute_type,
+            "loaded_at": handle.loaded_at if handle else None,
+            "inflight": handle.inflight if handle else 0,
+            "swap": dict(self.swap) if self.swap else None
+        }
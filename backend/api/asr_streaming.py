@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Transcription incrémentale (streaming) pour le service ASR Faster-Whisper
+
+Le client pousse des trames PCM au fil de l'eau ; chaque session décode une
+fenêtre glissante et renvoie une hypothèse partielle composée d'un préfixe
+stable (validé par deux décodages successifs) et d'une queue instable.
+À la fin de l'énoncé, seule la queue non validée reste à décoder, ce qui
+rend la transcription finale disponible quelques centaines de ms après la
+fin de la parole.
+
+Chaque décodage passe par `decoder()`, un gestionnaire de contexte qui
+réserve un décodeur (file d'admission, modèle courant) le temps du pas et
+fournit un objet exposant `transcribe` : les sessions sont comptées comme
+les autres requêtes et suivent les remplacements de modèle.
+"""
+import os
+import time
+import uuid
+import threading
+import logging
+import numpy as np
+
+from audio_ingest import TARGET_SAMPLE_RATE, pcm16_to_float32
+from audio_resample import StreamResampler
+
+logger = logging.getLogger(__name__)
+
+# Configuration du streaming
+STREAM_STEP_SECONDS = float(os.getenv('ASR_STREAM_STEP_SECONDS', '0.5'))
+STREAM_WINDOW_SECONDS = float(os.getenv('ASR_STREAM_WINDOW_SECONDS', '12.0'))
+STREAM_SESSION_TTL = float(os.getenv('ASR_STREAM_SESSION_TTL', '60'))
+STREAM_MAX_SESSIONS = int(os.getenv('ASR_STREAM_MAX_SESSIONS', '32'))
+
+
+def _common_prefix_len(a, b) -> int:
+    """Nombre de mots identiques en tête de deux hypothèses [(mot, fin)]"""
+    n = 0
+    for (x, _), (y, _) in zip(a, b):
+        if x.lower().strip('.,!?;:') != y.lower().strip('.,!?;:'):
+            break
+        n += 1
+    return n
+
+
+class StreamingSession:
+    """Session de transcription incrémentale sur fenêtre glissante"""
+
+    def __init__(self, decoder, sample_rate: int = TARGET_SAMPLE_RATE, channels: int = 1,
+                 language: str = "fr", beam_size: int = 5):
+        self.session_id = uuid.uuid4().hex
+        self.decoder = decoder
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.language = language
+        self.beam_size = beam_size
+        self.resampler = StreamResampler(sample_rate)
+        self.lock = threading.Lock()
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+
+        # Audio 16 kHz non encore validé et son décalage absolu (secondes)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0
+        self.pending_samples = 0
+
+        # Mots validés (texte, fin absolue) et dernière hypothèse instable
+        self.committed = []
+        self.previous_hypothesis = []
+        self.unstable = []
+        self.decode_count = 0
+        self.closed = False
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(word for word, _ in self.committed)
+
+    def _decode(self, audio: np.ndarray, beam_size: int):
+        """Décode la fenêtre courante et retourne [(mot, fin_absolue)]"""
+        prompt = " ".join(word for word, _ in self.committed[-30:]) or None
+        words = []
+        with self.decoder() as model:
+            segments, _ = model.transcribe(
+                audio,
+                language=self.language,
+                beam_size=beam_size,
+                temperature=0.0,
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                initial_prompt=prompt
+            )
+            # Les segments sont un générateur : le décodage a lieu pendant l'itération
+            for segment in segments:
+                for word in (segment.words or []):
+                    text = word.word.strip()
+                    if text:
+                        words.append((text, self.buffer_offset + word.end))
+        self.decode_count += 1
+        return words
+
+    def push(self, pcm_bytes: bytes) -> dict:
+        """Ajoute des trames PCM et décode si assez d'audio nouveau est arrivé"""
+        with self.lock:
+            self.last_activity = time.time()
+            audio = self.resampler.process(pcm16_to_float32(pcm_bytes, self.channels))
+            self.buffer = np.concatenate([self.buffer, audio])
+            self.pending_samples += len(audio)
+
+            if self.pending_samples < STREAM_STEP_SECONDS * TARGET_SAMPLE_RATE:
+                return self._partial(decoded=False)
+
+            # En cas de refus (file pleine), l'audio reste en tampon pour le pas suivant
+            hypothesis = self._decode(self.buffer, beam_size=1)
+            self.pending_samples = 0
+
+            # Accord local : les mots identiques sur deux décodages successifs sont validés
+            stable = _common_prefix_len(self.previous_hypothesis, hypothesis)
+            if stable:
+                self.committed.extend(hypothesis[:stable])
+                self._trim_buffer(hypothesis[stable - 1][1])
+                hypothesis = hypothesis[stable:]
+
+            # Fenêtre glissante : ne jamais redécoder plus de STREAM_WINDOW_SECONDS,
+            # les mots qui sortent de la fenêtre sont validés d'office
+            max_samples = int(STREAM_WINDOW_SECONDS * TARGET_SAMPLE_RATE)
+            if len(self.buffer) > max_samples:
+                new_offset = self.buffer_offset + (len(self.buffer) - max_samples) / TARGET_SAMPLE_RATE
+                forced = [w for w in hypothesis if w[1] <= new_offset]
+                self.committed.extend(forced)
+                hypothesis = hypothesis[len(forced):]
+                self._trim_buffer(new_offset)
+
+            self.previous_hypothesis = hypothesis
+            self.unstable = [word for word, _ in hypothesis]
+            return self._partial(decoded=True)
+
+    def _trim_buffer(self, absolute_end: float):
+        """Retire du tampon l'audio correspondant aux mots validés"""
+        cut = int((absolute_end - self.buffer_offset) * TARGET_SAMPLE_RATE)
+        cut = max(0, min(cut, len(self.buffer)))
+        self.buffer = self.buffer[cut:]
+        self.buffer_offset += cut / TARGET_SAMPLE_RATE
+        self.previous_hypothesis = []
+
+    def _partial(self, decoded: bool) -> dict:
+        return {
+            "type": "partial",
+            "session_id": self.session_id,
+            "stable": self.committed_text,
+            "unstable": " ".join(self.unstable),
+            "text": " ".join(filter(None, [self.committed_text, " ".join(self.unstable)])),
+            "decoded": decoded,
+            "audio_seconds": round(self.buffer_offset + len(self.buffer) / TARGET_SAMPLE_RATE, 3)
+        }
+
+    def finish(self) -> dict:
+        """Fin d'énoncé : décode la queue non validée avec le beam complet"""
+        with self.lock:
+            start = time.time()
+            if not self.closed:
+                self.closed = True
+                self.buffer = np.concatenate([self.buffer, self.resampler.flush()])
+            tail = []
+            if len(self.buffer) >= int(0.1 * TARGET_SAMPLE_RATE):
+                tail = self._decode(self.buffer, beam_size=self.beam_size)
+            self.committed.extend(tail)
+            self.unstable = []
+            return {
+                "type": "final",
+                "session_id": self.session_id,
+                "text": self.committed_text,
+                "language": self.language,
+                "duration": round(self.buffer_offset + len(self.buffer) / TARGET_SAMPLE_RATE, 3),
+                "decodes": self.decode_count,
+                "finalize_ms": round((time.time() - start) * 1000, 1)
+            }
+
+
+class StreamingSessionRegistry:
+    """Registre des sessions ouvertes (HTTP par morceaux et WebSocket), borné à max_sessions"""
+
+    def __init__(self, max_sessions: int = STREAM_MAX_SESSIONS, ttl: float = STREAM_SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.time()
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.last_activity > self.ttl]:
+            logger.info(f"⌛ Session de streaming expirée: {session_id}")
+            del self._sessions[session_id]
+
+    def create(self, decoder, **kwargs) -> StreamingSession:
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError("Trop de sessions de streaming ouvertes")
+            session = StreamingSession(decoder, **kwargs)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id: str):
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Détection d'activité vocale (VAD) avant décodage Whisper
+
+VAD énergétique entièrement vectorisée : énergie par trame de 30 ms,
+seuil adaptatif au plancher de bruit du clip, extension des zones de parole
+(padding) et fusion des courtes pauses. Le coût est de l'ordre de quelques
+dizaines de µs par seconde d'audio, ce qui permet de rejeter les clips sans
+parole et de retirer silences et bruit avant le décodage.
+"""
+import os
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Configuration de la VAD
+VAD_ENABLED = os.getenv('ASR_VAD', '1') == '1'
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = float(os.getenv('ASR_VAD_MARGIN_DB', '10'))
+VAD_MIN_THRESHOLD_DB = float(os.getenv('ASR_VAD_MIN_THRESHOLD_DB', '-45'))
+VAD_MAX_THRESHOLD_DB = float(os.getenv('ASR_VAD_MAX_THRESHOLD_DB', '-30'))
+VAD_MIN_SPEECH_MS = float(os.getenv('ASR_VAD_MIN_SPEECH_MS', '100'))
+VAD_MIN_SILENCE_MS = float(os.getenv('ASR_VAD_MIN_SILENCE_MS', '300'))
+VAD_PAD_MS = float(os.getenv('ASR_VAD_PAD_MS', '150'))
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> list:
+    """Retourne les zones de parole [(début, fin)] en échantillons"""
+    frame = int(sample_rate * VAD_FRAME_MS / 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.einsum('ij,ij->i', frames, frames) / frame
+    energy_db = 10.0 * np.log10(energy + 1e-10)
+
+    # Seuil adaptatif : plancher de bruit (10e percentile) + marge, borné
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = np.clip(noise_floor + VAD_MARGIN_DB, VAD_MIN_THRESHOLD_DB, VAD_MAX_THRESHOLD_DB)
+    voiced = energy_db > threshold
+    if not voiced.any():
+        return []
+
+    # Zones brutes de trames voisées consécutives
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.view(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+
+    # Fusion des pauses plus courtes que VAD_MIN_SILENCE_MS
+    min_gap = VAD_MIN_SILENCE_MS / VAD_FRAME_MS
+    keep = np.concatenate(([True], (starts[1:] - ends[:-1]) >= min_gap))
+    group = np.cumsum(keep) - 1
+    merged_starts = starts[keep]
+    merged_ends = np.maximum.reduceat(ends, np.flatnonzero(keep))
+
+    # Rejet des zones avec trop peu de trames voisées
+    voiced_frames = np.bincount(group, weights=ends - starts)
+    long_enough = voiced_frames * VAD_FRAME_MS >= VAD_MIN_SPEECH_MS
+
+    pad = int(sample_rate * VAD_PAD_MS / 1000)
+    total = len(audio)
+    return [
+        (max(0, int(s) * frame - pad), min(total, int(e) * frame + pad))
+        for s, e in zip(merged_starts[long_enough], merged_ends[long_enough])
+    ]
+
+
+def merge_regions(regions: list) -> list:
+    """Zones de parole triées, les paddings qui se chevauchent fusionnés"""
+    merged = []
+    for start, end in regions:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def trim_to_speech(audio: np.ndarray, regions: list) -> np.ndarray:
+    """Concatène les zones de parole (les paddings qui se chevauchent sont fusionnés)"""
+    if len(regions) == 1:
+        start, end = regions[0]
+        return audio[start:end]
+    return np.concatenate([audio[start:end] for start, end in merge_regions(regions)])
+
+
+def restore_timestamps(segments: list, regions: list, offset: int = 0,
+                       sample_rate: int = SAMPLE_RATE) -> list:
+    """Horodatages de segments décodés sur `trim_to_speech(audio, regions)` -> secondes de l'audio d'origine
+
+    Chaque instant est replacé dans sa zone de parole (les silences retirés
+    sont réinsérés) puis décalé de `offset` échantillons (début du morceau).
+    Une fin qui tombe pile sur une jonction reste dans la zone qui précède.
+    """
+    merged = merge_regions(regions)
+    if not merged:
+        return segments
+    trimmed_starts = np.cumsum([0] + [end - start for start, end in merged[:-1]])
+
+    def to_source(seconds: float, is_end: bool) -> float:
+        sample = seconds * sample_rate
+        i = max(int(np.searchsorted(trimmed_starts, sample, side='left' if is_end else 'right')) - 1, 0)
+        start, end = merged[i]
+        return round((offset + min(start + sample - trimmed_starts[i], end)) / sample_rate, 3)
+
+    def shift(item: dict) -> dict:
+        return dict(item, start=to_source(item["start"], False), end=to_source(item["end"], True))
+
+    restored = []
+    for segment in segments:
+        segment = shift(segment)
+        if segment.get("words"):
+            segment["words"] = [shift(word) for word in segment["words"]]
+        restored.append(segment)
+    return restored
+
+
+def regions_to_seconds(regions: list, sample_rate: int = SAMPLE_RATE) -> list:
+    return [[round(start / sample_rate, 3), round(end / sample_rate, 3)] for start, end in regions]
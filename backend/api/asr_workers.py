@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Pool de workers Whisper et contrôle d'admission pour le service ASR
+
+- `ProcessWorkerPool` : N processus possédant chacun leur `WhisperModel`
+  (ASR_WORKER_THREADS threads intra-op chacun). Il expose la même méthode
+  `transcribe` que `WhisperModel`, les segments étant matérialisés dans le
+  worker avant d'être renvoyés.
+- mode « shared » (ASR_WORKER_MODE=shared) : un seul processus, un seul jeu
+  de poids, ASR_WORKERS répliques CTranslate2 (`num_workers`) qui décodent
+  en parallèle. CTranslate2 démarre ses threads de répliques au chargement
+  et ils ne survivent pas à un fork : partager les poids par
+  « charger puis forker » bloquerait les enfants au premier décodage, ce
+  mode obtient le même partage sans fork.
+- `process_memory` : RSS / PSS / USS (mémoire propre) d'un processus, pour
+  vérifier ce qui est réellement partagé entre workers.
+- `AdmissionController` : file d'attente bornée devant les décodeurs. Quand
+  elle est pleine, la requête est rejetée immédiatement (503 + Retry-After)
+  au lieu de laisser la latence croître sans limite. Deux classes de
+  priorité : un décodeur libéré va toujours à la plus ancienne requête
+  interactive, sauf si une requête batch attend depuis plus de
+  ASR_PRIORITY_STARVATION_SECONDS (garde-fou contre la famine).
+"""
+import os
+import math
+import time
+from collections import deque
+import threading
+import logging
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Configuration du pool
+ASR_WORKERS = int(os.getenv('ASR_WORKERS', '0'))  # 0 = modèle dans le processus principal
+ASR_WORKER_THREADS = int(os.getenv('ASR_WORKER_THREADS', '0'))  # 0 = défaut CTranslate2
+ASR_MAX_QUEUE = int(os.getenv('ASR_MAX_QUEUE', '16'))
+ASR_WORKER_MODE = os.getenv('ASR_WORKER_MODE', 'process')  # process | shared
+ASR_PRIORITY_STARVATION_SECONDS = float(os.getenv('ASR_PRIORITY_STARVATION_SECONDS', '10'))
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+
+class QueueFullError(RuntimeError):
+    """File d'attente ASR pleine : la requête doit être réessayée plus tard"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("ASR queue is full")
+        self.retry_after = retry_after
+
+
+def process_memory(pid="self") -> dict:
+    """RSS, PSS et USS (pages privées) en octets, depuis /proc/<pid>/smaps_rollup"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if rest.strip().endswith("kB"):
+                    fields[name] = int(rest.split()[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+# --- Côté worker -------------------------------------------------------------
+
+_worker_model = None
+
+
+def _init_worker(model_size: str, device: str, compute_type: str, cpu_threads: int):
+    """Charge le modèle une fois par processus worker"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+    logger.info(f"✅ Worker ASR {os.getpid()} prêt ({model_size}, {cpu_threads or 'auto'} threads)")
+
+
+def _worker_transcribe(audio, options: dict):
+    segments, info = _worker_model.transcribe(audio, **options)
+    return list(segments), info
+
+
+class ProcessWorkerPool:
+    """Pool de processus exposant l'interface `transcribe` de WhisperModel"""
+
+    def __init__(self, workers: int, model_size: str, device: str, compute_type: str,
+                 cpu_threads: int = ASR_WORKER_THREADS):
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        # spawn : pas de fork d'un processus déjà multi-threadé (Flask, batcher)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_size, device, compute_type, cpu_threads)
+        )
+        # Démarre tous les workers maintenant plutôt qu'à la première requête
+        for future in [self._executor.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+
+    def worker_pids(self) -> list:
+        return sorted(self._executor._processes or {})
+
+    def transcribe(self, audio, **options):
+        return self._executor.submit(_worker_transcribe, audio, options).result()
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# --- Côté frontal ------------------------------------------------------------
+
+class AdmissionController:
+    """File d'attente bornée et prioritaire devant `capacity` décodeurs concurrents
+
+    Les requêtes batch ne peuvent occuper la file que si elle n'est pas
+    pleine ; une requête interactive n'est rejetée que si la file contient
+    déjà `max_queue` requêtes interactives.
+    """
+
+    def __init__(self, capacity: int, max_queue: int = ASR_MAX_QUEUE,
+                 starvation_seconds: float = ASR_PRIORITY_STARVATION_SECONDS):
+        self.capacity = max(1, capacity)
+        self.max_queue = max(0, max_queue)
+        self.starvation_seconds = starvation_seconds
+        self._cond = threading.Condition()
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.starvation_grants = 0
+        self._busy_seconds = 0.0
+        self._active_since = {}
+        self._avg_service_time = 1.0
+        self._started_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        """Estimation (s) du temps d'écoulement de la file actuelle"""
+        backlog = (self.waiting + self.active) / self.capacity
+        return max(1, math.ceil(backlog * self._avg_service_time))
+
+    def _next_ticket(self):
+        """Prochain servi : interactif d'abord, sauf batch affamé"""
+        interactive, batch = self._queues[PRIORITY_INTERACTIVE], self._queues[PRIORITY_BATCH]
+        if batch and (not interactive or time.monotonic() - batch[0][0] >= self.starvation_seconds):
+            return batch[0]
+        return interactive[0] if interactive else None
+
+    @contextmanager
+    def slot(self, priority: str = PRIORITY_INTERACTIVE):
+        """Réserve un décodeur ou lève QueueFullError si la file est pleine
+
+        Renvoie le temps passé en file d'attente (s).
+        """
+        enqueued = time.monotonic()
+        queue = self._queues[priority]
+        with self._cond:
+            queued = len(queue) if priority == PRIORITY_INTERACTIVE else self.waiting
+            if self.active >= self.capacity and queued >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after())
+            ticket = (enqueued, object())
+            queue.append(ticket)
+            self.waiting += 1
+            while self.active >= self.capacity or self._next_ticket() is not ticket:
+                self._cond.wait()
+            queue.popleft()
+            if priority == PRIORITY_BATCH and self._queues[PRIORITY_INTERACTIVE]:
+                self.starvation_grants += 1
+            self.waiting -= 1
+            self.active += 1
+            if self.active < self.capacity and self.waiting:
+                self._cond.notify_all()
+            self.admitted += 1
+            token = object()
+            started = time.monotonic()
+            self._active_since[token] = started
+        try:
+            yield started - enqueued
+        finally:
+            with self._cond:
+                elapsed = time.monotonic() - started
+                del self._active_since[token]
+                self._busy_seconds += elapsed
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * elapsed
+                self.active -= 1
+                self._cond.notify_all()
+
+    def resize(self, capacity: int):
+        """Change le nombre de décodeurs (nouveau modèle, découpage calibré)"""
+        with self._cond:
+            self.capacity = max(1, capacity)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            busy = self._busy_seconds + sum(now - t for t in self._active_since.values())
+            uptime = max(now - self._started_at, 1e-6)
+            return {
+                "capacity": self.capacity,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "queue_depth_by_priority": {priority: len(queue) for priority, queue in self._queues.items()},
+                "starvation_grants": self.starvation_grants,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "utilisation": round(self.active / self.capacity, 3),
+                "utilisation_avg": round(busy / (uptime * self.capacity), 3),
+                "avg_service_seconds": round(self._avg_service_time, 3)
+            }
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Ingestion audio en mémoire pour le service ASR
+
+Tous les formats d'entrée sont décodés depuis un tampon mémoire vers du
+float32 mono, sans fichier temporaire ni processus ffmpeg :
+- PCM brut s16le : lu directement dans le tampon reçu
+- WAV, FLAC, OGG/Vorbis, OGG/Opus : libsndfile (soundfile)
+- WebM/Opus, Matroska, MP4... : PyAV (libavformat/libavcodec dans le
+  processus), si disponible ; c'est aussi le recours si libsndfile ne
+  connaît pas le codec
+
+Le décodage se fait par blocs envoyés au fil de l'eau au rééchantillonneur
+16 kHz : le signal complet à la fréquence d'origine n'est jamais matérialisé.
+"""
+import io
+from contextlib import contextmanager
+import numpy as np
+import soundfile as sf
+
+from audio_resample import TARGET_SAMPLE_RATE, ResampleError, StreamResampler, resample
+
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+PCM16_SCALE = np.float32(1.0 / 32768.0)
+INGEST_BLOCK_FRAMES = 1 << 16
+
+# Signatures des conteneurs lus par libsndfile
+SOUNDFILE_SIGNATURES = (b"RIFF", b"RF64", b"fLaC", b"OggS", b"FORM")
+
+
+class AudioDecodeError(ValueError):
+    """Audio illisible ou paramètres de flux invalides"""
+
+
+def pcm16_to_float32(pcm_bytes, channels: int = 1) -> np.ndarray:
+    """Convertit du PCM s16le entrelacé en float32 mono dans [-1, 1]
+
+    `np.frombuffer` lit directement le tampon reçu ; la seule allocation est
+    le tableau float32 de sortie.
+    """
+    if channels < 1:
+        raise AudioDecodeError(f"Nombre de canaux invalide: {channels}")
+    view = memoryview(pcm_bytes)
+    usable = len(view) - len(view) % (2 * channels)
+    samples = np.frombuffer(view[:usable], dtype=np.int16)
+
+    if channels == 1:
+        audio = np.empty(len(samples), dtype=np.float32)
+        np.multiply(samples, PCM16_SCALE, out=audio, casting='unsafe')
+        return audio
+
+    audio = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    audio *= PCM16_SCALE
+    return audio
+
+
+def _soundfile_blocks(source):
+    for block in source.blocks(INGEST_BLOCK_FRAMES, dtype='float32', always_2d=True):
+        yield block[:, 0] if block.shape[1] == 1 else block.mean(axis=1, dtype=np.float32)
+
+
+def _pyav_blocks(container, stream):
+    # Conversion en float32 entrelacé mono à la fréquence d'origine
+    converter = av.AudioResampler(format='flt', layout='mono', rate=stream.codec_context.sample_rate)
+    for frame in container.decode(stream):
+        for converted in converter.resample(frame):
+            yield converted.to_ndarray().reshape(-1)
+    for converted in converter.resample(None):
+        yield converted.to_ndarray().reshape(-1)
+
+
+def _open_soundfile(fileobj):
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    if AV_AVAILABLE and head not in SOUNDFILE_SIGNATURES:
+        return None
+    try:
+        return sf.SoundFile(fileobj)
+    except Exception:
+        # OGG/Opus non pris en charge par une libsndfile ancienne : PyAV prend le relais
+        if not AV_AVAILABLE:
+            raise
+        fileobj.seek(0)
+        return None
+
+
+@contextmanager
+def open_audio(data):
+    """Ouvre un fichier audio (octets ou objet fichier) sans le décoder entièrement
+
+    Produit (fréquence d'origine, itérateur de blocs float32 mono). Toute
+    erreur de lecture ou de décodage devient une AudioDecodeError.
+    """
+    fileobj = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    try:
+        source = _open_soundfile(fileobj)
+        if source is not None:
+            with source:
+                yield source.samplerate, _soundfile_blocks(source)
+            return
+        with av.open(fileobj, mode='r') as container:
+            if not container.streams.audio:
+                raise AudioDecodeError("Aucun flux audio dans le fichier")
+            stream = container.streams.audio[0]
+            if not stream.codec_context.sample_rate:
+                raise AudioDecodeError("Fréquence d'échantillonnage inconnue")
+            yield stream.codec_context.sample_rate, _pyav_blocks(container, stream)
+    except AudioDecodeError:
+        raise
+    except ResampleError as e:
+        raise AudioDecodeError(str(e)) from e
+    except Exception as e:
+        raise AudioDecodeError(f"Format audio non supporté: {e}") from e
+
+
+def decode_audio_bytes(data) -> tuple:
+    """Décode un fichier audio complet depuis la mémoire, à sa fréquence d'origine
+
+    Retourne (audio float32 mono, fréquence d'échantillonnage).
+    """
+    with open_audio(data) as (sample_rate, blocks):
+        pieces = list(blocks)
+    audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    return audio.astype(np.float32, copy=False), sample_rate
+
+
+def decode_to_model_rate(data) -> tuple:
+    """Décode et rééchantillonne à 16 kHz bloc par bloc
+
+    Retourne (audio float32 mono 16 kHz, fréquence d'origine).
+    """
+    with open_audio(data) as (sample_rate, blocks):
+        resampler = StreamResampler(int(sample_rate))
+        pieces = [resampler.process(block) for block in blocks]
+        pieces.append(resampler.flush())
+    return np.concatenate(pieces), sample_rate
+
+
+def to_model_rate(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Ramène l'audio à 16 kHz (filtre polyphase en cache par couple de fréquences)"""
+    try:
+        return resample(audio, int(sample_rate), TARGET_SAMPLE_RATE)
+    except ResampleError as e:
+        raise AudioDecodeError(str(e)) from e
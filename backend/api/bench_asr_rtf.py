@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark du facteur temps réel (RTF) du service ASR Faster-Whisper
+
+Rejoue un répertoire de clips WAV français dans le chemin de transcription
+du service (décodage en mémoire, rééchantillonnage 16 kHz, VAD, Whisper)
+en balayant taille de modèle, compute type, beam et nombre de threads.
+Pour chaque configuration : RTF, latence p50/p95 par clip, pic de RSS et
+taux d'erreur mots (WER) par rapport aux transcriptions de référence
+(`clip.txt` à côté de `clip.wav`).
+
+Chaque couple (modèle, compute type, threads) tourne dans un processus
+séparé pour que le pic de RSS mesuré lui soit propre. Fonctionne hors ligne
+sur CPU si les modèles sont déjà dans le cache (ou --model-dir).
+
+Usage :
+    python bench_asr_rtf.py clips/ --models base,small,medium \\
+        --compute-types int8,float32 --beams 1,5 --threads 2,4 --output bench.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import itertools
+import unicodedata
+import multiprocessing
+from queue import Empty
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_ingest import TARGET_SAMPLE_RATE, decode_to_model_rate
+from asr_vad import detect_speech, trim_to_speech
+from asr_batching import segments_to_result
+
+
+def normalize_text(text: str) -> list:
+    """Minuscules, sans ponctuation, élisions séparées (l'entretien -> l' entretien)"""
+    text = unicodedata.normalize("NFC", text.lower())
+    text = re.sub(r"[’']", "' ", text)
+    text = re.sub(r"[^\w' -]", " ", text)
+    return [word for word in re.split(r"[\s-]+", text) if word]
+
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    """Distance d'édition (substitutions + insertions + suppressions) en mots"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1]
+
+
+def load_clips(directory: Path, use_vad: bool) -> list:
+    """Clips prétraités comme dans le service (16 kHz mono float32, VAD)"""
+    clips = []
+    for path in sorted(directory.glob("*.wav")):
+        audio, _ = decode_to_model_rate(path.read_bytes())
+        duration = len(audio) / TARGET_SAMPLE_RATE
+        if use_vad:
+            regions = detect_speech(audio)
+            if not regions:
+                continue
+            audio = trim_to_speech(audio, regions)
+        reference_path = path.with_suffix(".txt")
+        reference = reference_path.read_text(encoding="utf-8").strip() if reference_path.exists() else None
+        clips.append({"name": path.name, "audio": audio, "duration": duration, "reference": reference})
+    return clips
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_model_group(model_size, compute_type, cpu_threads, beams, args, queue):
+    """Processus enfant : charge un modèle et mesure chaque réglage de beam"""
+    try:
+        from faster_whisper import WhisperModel
+
+        clips = load_clips(Path(args.clips), not args.no_vad)
+        load_start = time.perf_counter()
+        model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads,
+                             download_root=args.model_dir, local_files_only=True)
+        load_seconds = time.perf_counter() - load_start
+
+        for beam_size in beams:
+            options = dict(language=args.language, beam_size=beam_size, best_of=beam_size, temperature=0.0)
+            for clip in clips[:args.warmup]:
+                list(model.transcribe(clip["audio"], **options)[0])
+
+            latencies, errors, ref_words, audio_seconds = [], 0, 0, 0.0
+            for _ in range(args.repeats):
+                for clip in clips:
+                    start = time.perf_counter()
+                    segments, info = model.transcribe(clip["audio"], **options)
+                    result = segments_to_result(segments, info)
+                    latencies.append(time.perf_counter() - start)
+                    audio_seconds += clip["duration"]
+                    if clip["reference"] is not None:
+                        reference = normalize_text(clip["reference"])
+                        errors += word_errors(reference, normalize_text(result["text"]))
+                        ref_words += len(reference)
+
+            decode_seconds = float(np.sum(latencies))
+            queue.put({
+                "model": model_size,
+                "compute_type": compute_type,
+                "beam_size": beam_size,
+                "cpu_threads": cpu_threads,
+                "clips": len(clips),
+                "load_seconds": round(load_seconds, 2),
+                "audio_seconds": round(audio_seconds, 2),
+                "decode_seconds": round(decode_seconds, 3),
+                "rtf": round(decode_seconds / audio_seconds, 4) if audio_seconds else None,
+                "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+                "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else None,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "wer": round(errors / ref_words, 4) if ref_words else None
+            })
+    except Exception as e:
+        queue.put({"model": model_size, "compute_type": compute_type, "cpu_threads": cpu_threads,
+                   "error": str(e)})
+
+
+def print_table(results: list):
+    columns = [("model", 8), ("compute_type", 12), ("beam_size", 4), ("cpu_threads", 7), ("rtf", 7),
+               ("latency_p50_ms", 9), ("latency_p95_ms", 9), ("peak_rss_mb", 9), ("wer", 6)]
+    headers = ["model", "compute", "beam", "threads", "RTF", "p50 ms", "p95 ms", "RSS Mo", "WER"]
+    print("  ".join(h.ljust(w) for h, (_, w) in zip(headers, columns)))
+    print("  ".join("-" * w for _, w in columns))
+    for result in results:
+        if "error" in result:
+            print(f"{result['model']:<8}  {result['compute_type']:<12}  ❌ {result['error']}")
+            continue
+        print("  ".join(str(result.get(key, "")).ljust(width) for key, width in columns))
+
+
+def parse_list(value: str, cast=str) -> list:
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RTF / latence / RSS / WER du service ASR")
+    parser.add_argument("clips", help="Répertoire de clips .wav (références optionnelles .txt)")
+    parser.add_argument("--models", default="base,medium")
+    parser.add_argument("--compute-types", default="int8")
+    parser.add_argument("--beams", default="1,5")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 4))
+    parser.add_argument("--language", default="fr")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1, help="Clips de chauffe avant mesure")
+    parser.add_argument("--model-dir", default=None, help="Répertoire des modèles (cache Hugging Face par défaut)")
+    parser.add_argument("--no-vad", action="store_true", help="Désactive la VAD du service")
+    parser.add_argument("--output", default="asr_benchmark.json")
+    args = parser.parse_args()
+
+    if not any(Path(args.clips).glob("*.wav")):
+        parser.error(f"Aucun fichier .wav dans {args.clips}")
+
+    beams = parse_list(args.beams, int)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for model_size, compute_type, cpu_threads in itertools.product(
+            parse_list(args.models), parse_list(args.compute_types), parse_list(args.threads, int)):
+        print(f"⏱️ {model_size} / {compute_type} / {cpu_threads} threads...", flush=True)
+        queue = context.Queue()
+        process = context.Process(target=run_model_group,
+                                  args=(model_size, compute_type, cpu_threads, beams, args, queue))
+        process.start()
+        expected = len(beams)
+        while expected:
+            try:
+                result = queue.get(timeout=5)
+            except Empty:
+                if process.is_alive():
+                    continue
+                result = {"model": model_size, "compute_type": compute_type, "cpu_threads": cpu_threads,
+                          "error": f"processus terminé (code {process.exitcode})"}
+            results.append(result)
+            expected = 0 if "error" in result else expected - 1
+        process.join()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "clips_dir": os.path.abspath(args.clips),
+        "vad": not args.no_vad,
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print_table(results)
+    print(f"\n📄 Rapport JSON: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
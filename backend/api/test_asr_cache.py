@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test du regroupement (single-flight) du cache de transcriptions : le
+résultat du décodage partagé n'est jamais modifié par le meneur, chaque
+requête complète sa propre copie (fréquence d'origine différente).
+
+Usage :
+    python -m pytest backend/api/test_asr_cache.py
+"""
+import os
+import sys
+import copy
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asr_cache
+from asr_cache import TranscriptionCache
+
+
+def transcribe_as_service(cache, key, compute, sample_rate, seen=None):
+    """Comme _transcribe_response : résultat complété par la fréquence d'origine"""
+    result = cache.get_or_compute(key, compute)
+    if seen is not None:
+        seen.append(result.get("input_sample_rate"))
+    result["input_sample_rate"] = sample_rate
+    return result
+
+
+def test_leader_mutation_is_not_seen_by_followers(monkeypatch):
+    cache = TranscriptionCache()
+    decoding = threading.Event()
+    release = threading.Event()
+    leader_done = threading.Event()
+
+    def compute():
+        decoding.set()
+        assert release.wait(5)
+        return {"text": "bonjour", "segments": [{"start": 0.0, "end": 1.0}]}
+
+    # Le suiveur ne copie le résultat partagé qu'après la modification par le meneur
+    real_deepcopy = copy.deepcopy
+
+    def deepcopy_after_leader(value, *args):
+        if threading.current_thread().name == "follower":
+            assert leader_done.wait(5)
+        return real_deepcopy(value, *args)
+
+    monkeypatch.setattr(asr_cache, "copy", type("copy", (), {"deepcopy": staticmethod(deepcopy_after_leader)}))
+
+    results = {}
+
+    def leader():
+        results["leader"] = transcribe_as_service(cache, "clip", compute, 48000)
+        leader_done.set()
+
+    seen = []
+
+    def follower():
+        results["follower"] = transcribe_as_service(cache, "clip", compute, 16000, seen)
+
+    leader_thread = threading.Thread(target=leader, name="leader")
+    leader_thread.start()
+    assert decoding.wait(5)
+    follower_thread = threading.Thread(target=follower, name="follower")
+    follower_thread.start()
+    while cache.snapshot()["coalesced"] < 1:
+        pass
+    release.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+
+    assert seen == [None]
+    assert results["leader"]["input_sample_rate"] == 48000
+    assert results["follower"]["input_sample_rate"] == 16000
+    assert results["follower"]["cached"] is True
+    assert "input_sample_rate" not in cache.get_or_compute("clip", compute)
+
+
+def test_concurrent_followers_keep_their_own_rates():
+    cache = TranscriptionCache()
+    start = threading.Barrier(9)
+    release = threading.Event()
+
+    def compute():
+        assert release.wait(5)
+        return {"text": "bonjour " * 50, "words": [{"word": "bonjour", "start": i * 0.1} for i in range(200)]}
+
+    rates = [8000, 16000, 22050, 24000, 32000, 44100, 48000, 96000]
+    results = [None] * len(rates)
+
+    def request(index):
+        start.wait()
+        results[index] = transcribe_as_service(cache, "clip", compute, rates[index])
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(len(rates))]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    while cache.snapshot()["coalesced"] < len(rates) - 1:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [r["input_sample_rate"] for r in results] == rates
+    assert len({id(r) for r in results}) == len(rates)
+    assert "input_sample_rate" not in cache.get_or_compute("clip", compute)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test du recollage des morceaux d'un job long : les horodatages des segments
+et des mots, décodés sur l'audio réduit à la parole de chaque morceau, sont
+replacés en secondes absolues de l'enregistrement.
+
+Le décodeur est simulé : il renvoie des segments réguliers relatifs à
+l'audio qu'il reçoit, comme Whisper.
+
+Usage :
+    python -m pytest backend/api/test_asr_jobs.py
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asr_jobs
+from asr_jobs import JobManager
+
+SAMPLE_RATE = 16000
+BURST_PERIOD = 2.0
+BURST_SECONDS = 1.2
+SEGMENT_SECONDS = 0.5
+
+
+def bursts_wav(duration: float) -> io.BytesIO:
+    """Salves de bruit de BURST_SECONDS toutes les BURST_PERIOD s, séparées de silence"""
+    rng = np.random.default_rng(0)
+    audio = np.zeros(int(duration * SAMPLE_RATE), dtype=np.float32)
+    for start in np.arange(0.0, duration, BURST_PERIOD):
+        first = int(start * SAMPLE_RATE)
+        last = min(first + int(BURST_SECONDS * SAMPLE_RATE), len(audio))
+        audio[first:last] = rng.uniform(-0.3, 0.3, last - first)
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    buffer.seek(0)
+    return buffer
+
+
+def fake_transcribe(audio: np.ndarray, priority: str = None) -> dict:
+    """Un segment de deux mots par SEGMENT_SECONDS d'audio reçu, horodaté depuis 0"""
+    duration = len(audio) / SAMPLE_RATE
+    segments = []
+    for start in np.arange(0.0, duration - 1e-6, SEGMENT_SECONDS):
+        end = min(start + SEGMENT_SECONDS, duration)
+        middle = (start + end) / 2
+        segments.append({
+            "start": float(start), "end": float(end), "text": "mot mot",
+            "words": [{"word": " mot", "start": float(start), "end": float(middle), "probability": 1.0},
+                      {"word": " mot", "start": float(middle), "end": float(end), "probability": 1.0}]
+        })
+    return {"text": " ".join(s["text"] for s in segments), "segments": segments}
+
+
+def test_chunk_timestamps_are_absolute_and_monotonic(monkeypatch):
+    monkeypatch.setattr(asr_jobs, "JOB_CHUNK_MAX_SECONDS", 6.0)
+    monkeypatch.setattr(asr_jobs, "JOB_CHUNK_MIN_SECONDS", 2.0)
+    duration = 20.0
+    manager = JobManager(fake_transcribe, parallelism=2)
+    job = manager.submit(bursts_wav(duration), "bursts.wav")
+
+    deadline = time.time() + 30
+    version = 0
+    while not job.finished and time.time() < deadline:
+        version = job.wait_for_change(version, 1.0)
+    status = job.status()
+    assert status["state"] == "done", status
+
+    chunks = status["result"]["segments"]
+    assert len(chunks) >= 3
+    segments = [segment for chunk in chunks for segment in chunk["segments"]]
+    words = [word for segment in segments for word in segment["words"]]
+    assert segments and words
+
+    for items in (segments, words):
+        starts = [item["start"] for item in items]
+        ends = [item["end"] for item in items]
+        assert starts == sorted(starts)
+        assert ends == sorted(ends)
+        assert all(item["start"] <= item["end"] for item in items)
+        assert all(nxt["start"] >= prev["end"] - 1e-3 for prev, nxt in zip(items, items[1:]))
+    assert segments[-1]["end"] <= duration
+
+    # Chaque morceau reste dans son intervalle, au-delà des morceaux précédents
+    for chunk in chunks:
+        assert chunk["segments"][0]["start"] >= chunk["start"] - 1e-3
+        assert chunk["segments"][-1]["end"] <= chunk["end"] + 1e-3
+    assert chunks[-1]["segments"][0]["start"] > BURST_PERIOD * 2
+
+    # Les silences retirés sont réinsérés : chaque mot tombe dans une salve (padding VAD compris)
+    margin = 0.2
+    for word in words:
+        for instant in (word["start"], word["end"]):
+            burst = np.floor((instant + margin) / BURST_PERIOD) * BURST_PERIOD
+            assert instant <= burst + BURST_SECONDS + margin, word
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test du remplacement à chaud du modèle ASR : les workers de l'ancien modèle
+doivent être arrêtés une fois les requêtes en cours terminées.
+
+Les workers « spawn » chargent un faux module faster_whisper placé en tête
+de sys.path (hérité par les processus enfants) : aucun modèle à télécharger.
+
+Usage :
+    python -m pytest backend/api/test_asr_model_manager.py
+"""
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_FASTER_WHISPER = '''
+class WhisperModel:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def transcribe(self, audio, **options):
+        return iter([]), None
+'''
+
+
+def wait_for(predicate, timeout: float = 60.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return predicate()
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.fixture
+def fake_whisper_path(tmp_path):
+    (tmp_path / "faster_whisper.py").write_text(FAKE_FASTER_WHISPER)
+    sys.path.insert(0, str(tmp_path))
+    yield
+    sys.path.remove(str(tmp_path))
+
+
+def test_swap_shuts_down_previous_worker_pools(fake_whisper_path):
+    from asr_model_manager import ModelHandle, ModelManager
+    from asr_workers import ProcessWorkerPool
+
+    def factory(model_size, compute_type):
+        pool = ProcessWorkerPool(2, model_size, "cpu", compute_type, cpu_threads=1)
+        return ModelHandle(pool, model_size, compute_type, workers=2)
+
+    manager = ModelManager(factory, "tiny", "int8")
+    manager.start()
+    assert wait_for(lambda: manager.ready), manager.status()
+    retired_pids = []
+
+    for model_size in ("base", "small"):
+        previous = manager.current
+        retired_pids += previous.model.worker_pids()
+        # Une requête en cours retient l'ancien modèle pendant le remplacement
+        with manager.acquire() as handle:
+            assert handle is previous
+            manager.request_swap(model_size, "int8")
+            assert wait_for(lambda: manager.current is not previous), manager.status()
+            assert all(pid_alive(pid) for pid in previous.model.worker_pids())
+        assert wait_for(lambda: not any(pid_alive(pid) for pid in retired_pids)), retired_pids
+
+    current_pids = manager.current.model.worker_pids()
+    assert len(current_pids) == 2 and all(pid_alive(pid) for pid in current_pids)
+    assert not set(current_pids) & set(retired_pids)
+    manager.current.close()
+
+
+class BlockingHandle:
+    """Handle minimal dont la chauffe attend un signal"""
+
+    def __init__(self, model_size: str, workers: int):
+        from asr_model_manager import ModelHandle
+        self.handle = ModelHandle(None, model_size, "int8", workers=workers,
+                                  layout={"workers": workers, "threads": 1, "source": "test"})
+        self.release = threading.Event()
+        self.handle.warm_up = lambda: self.release.wait(10)
+        self.handle.close = lambda: None
+
+
+def test_layout_applied_only_when_model_is_published():
+    from asr_model_manager import ModelManager
+
+    built = {}
+    published = []
+
+    def factory(model_size, compute_type):
+        if model_size == "broken":
+            raise RuntimeError("chargement impossible")
+        built[model_size] = BlockingHandle(model_size, workers={"tiny": 2, "small": 4}[model_size])
+        return built[model_size].handle
+
+    manager = ModelManager(factory, "tiny", "int8", on_publish=lambda h: published.append(h.layout["workers"]))
+    manager.start()
+    assert wait_for(lambda: "tiny" in built)
+    assert published == []  # chargé mais pas encore chauffé
+    built["tiny"].release.set()
+    assert wait_for(lambda: manager.ready)
+    assert published == [2]
+
+    # Remplacement en échec : le découpage courant reste en place
+    manager.request_swap("broken", "int8")
+    assert wait_for(lambda: manager.swap["state"] == "error")
+    assert published == [2]
+
+    # Remplacement en chauffe : toujours l'ancien découpage, puis le nouveau à la publication
+    manager.request_swap("small", "int8")
+    assert wait_for(lambda: manager.swap["state"] == "warming")
+    assert published == [2] and manager.current is built["tiny"].handle
+    built["small"].release.set()
+    assert wait_for(lambda: manager.swap["state"] == "ready")
+    assert published == [2, 4] and manager.current is built["small"].handle
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -3,53 +3,448 @@
 Service ASR (Automatic Speech Recognition) avec Faster-Whisper
 Compatible avec l'agent LiveKit Eloquence 2.0
 """
+import io
 import os
-import tempfile
+import json
+import time
 import logging
-from flask import Flask, request, jsonify
+import multiprocessing
+from contextlib import contextmanager
+from flask import Flask, Request, Response, g, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 from faster_whisper import WhisperModel
-import soundfile as sf
 import numpy as np
 
+from audio_ingest import (AudioDecodeError, TARGET_SAMPLE_RATE, decode_to_model_rate,
+                          pcm16_to_float32, to_model_rate)
+from asr_streaming import StreamingSessionRegistry
+from asr_batching import MicroBatchScheduler, BATCH_WINDOW_MS, BATCH_MAX_SIZE
+from asr_decoding_policy import DecodingPolicy, FALLBACK_MODEL_SIZE, POLICY_ENABLED
+from asr_cache import TranscriptionCache, audio_fingerprint
+from asr_vad import VAD_ENABLED, detect_speech, trim_to_speech, restore_timestamps, regions_to_seconds
+from asr_model_manager import ModelHandle, ModelManager, ModelNotReadyError
+from asr_metrics import MetricsRegistry
+from asr_jobs import JOB_CHUNK_MAX_SECONDS, JobManager, chunk_segments, iter_chunks
+from asr_autotune import AUTOTUNE_ENABLED, available_cores, resolve_layout
+from asr_workers import (AdmissionController, ProcessWorkerPool, QueueFullError, process_memory,
+                         ASR_WORKERS, ASR_WORKER_THREADS, ASR_MAX_QUEUE, ASR_WORKER_MODE,
+                         PRIORITIES, PRIORITY_BATCH, PRIORITY_INTERACTIVE)
+
+try:
+    from flask_sock import Sock
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
 # Configuration des logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Taille max d'un envoi gardé en mémoire (hors /asr/jobs, spoolé sur disque) ; au-delà : 413
+MAX_UPLOAD_BYTES = int(float(os.getenv('ASR_MAX_UPLOAD_MB', '25')) * 1024 * 1024)
+
+class InMemoryUploadRequest(Request):
+    """Fichiers multipart gardés en mémoire (Werkzeug les écrit sur disque au-delà de 500 Ko)
+
+    Les jobs longs gardent le comportement par défaut pour borner la mémoire ;
+    les autres envois sont limités à ASR_MAX_UPLOAD_MB (0 = sans limite).
+    """
+
+    @property
+    def max_content_length(self):
+        if self.path.startswith('/asr/jobs') or MAX_UPLOAD_BYTES <= 0:
+            return None
+        return MAX_UPLOAD_BYTES
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path.startswith('/asr/jobs'):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 CORS(app)
+sock = Sock(app) if WEBSOCKET_AVAILABLE else None
 
 # Configuration Whisper
 MODEL_SIZE = os.getenv('WHISPER_MODEL_SIZE', 'base')
 DEVICE = os.getenv('WHISPER_DEVICE', 'cpu')
 COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
 
-# Initialisation du modèle Whisper
-logger.info(f"Initialisation du modèle Whisper: {MODEL_SIZE} sur {DEVICE}")
-try:
-    whisper_model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
-    logger.info("✅ Modèle Whisper initialisé avec succès")
-except Exception as e:
-    logger.error(f"❌ Erreur lors de l'initialisation de Whisper: {e}")
-    whisper_model = None
+# Découpage workers x threads effectif (variables d'environnement ou calibration)
+active_layout = {"workers": ASR_WORKERS, "threads": ASR_WORKER_THREADS, "source": "env"}
+
+def decoder_capacity_for(workers: int) -> int:
+    if workers > 0:
+        return workers
+    return BATCH_MAX_SIZE if BATCH_WINDOW_MS > 0 else 1
+
+def build_model_handle(model_size: str, compute_type: str) -> ModelHandle:
+    """Modèle dans le processus principal, ou pool de workers si ASR_WORKERS > 0
+
+    Le découpage retenu voyage avec le handle : il n'est appliqué au service
+    (apply_model_layout) qu'à la publication du modèle chauffé.
+    """
+    layout = {"workers": ASR_WORKERS, "threads": ASR_WORKER_THREADS, "source": "env"}
+    tuned = resolve_layout(model_size, DEVICE, compute_type) if AUTOTUNE_ENABLED and DEVICE == 'cpu' else None
+    if tuned:
+        layout = tuned
+        # Un seul worker retenu : modèle dans le processus principal (micro-batching possible)
+        if layout["workers"] == 1:
+            layout["workers"] = 0
+    workers, threads = layout["workers"], layout["threads"]
+
+    if workers > 0 and ASR_WORKER_MODE == 'shared':
+        # Un seul jeu de poids, `workers` répliques CTranslate2 décodant en parallèle
+        logger.info(f"Initialisation du modèle Whisper: {model_size} sur {DEVICE} ({workers} répliques)")
+        model = WhisperModel(model_size, device=DEVICE, compute_type=compute_type, cpu_threads=threads,
+                             num_workers=workers)
+        handle = ModelHandle(model, model_size, compute_type, workers=workers, layout=layout)
+    elif workers > 0:
+        logger.info(f"Initialisation de {workers} workers Whisper: {model_size} sur {DEVICE}")
+        model = ProcessWorkerPool(workers, model_size, DEVICE, compute_type, threads)
+        handle = ModelHandle(model, model_size, compute_type, workers=workers, layout=layout)
+    else:
+        logger.info(f"Initialisation du modèle Whisper: {model_size} sur {DEVICE}")
+        model = WhisperModel(model_size, device=DEVICE, compute_type=compute_type, cpu_threads=threads)
+        # Micro-batching des requêtes concurrentes (désactivé si ASR_BATCH_WINDOW_MS=0,
+        # et en mode pool où chaque worker décode ses requêtes indépendamment)
+        scheduler = MicroBatchScheduler(model) if BATCH_WINDOW_MS > 0 else None
+        handle = ModelHandle(model, model_size, compute_type, batch_scheduler=scheduler, layout=layout)
+    return handle
+
+def apply_model_layout(handle: ModelHandle):
+    """Publication d'un modèle : son découpage et sa capacité deviennent ceux du service"""
+    global active_layout
+    active_layout = handle.layout
+    admission.resize(decoder_capacity_for(handle.layout["workers"]))
+
+def build_fallback_handle(model_size: str, compute_type: str) -> ModelHandle:
+    """Modèle de secours plus petit, toujours dans le processus principal"""
+    model = WhisperModel(model_size, device=DEVICE, compute_type=compute_type)
+    return ModelHandle(model, model_size, compute_type)
+
+# Chargement du modèle Whisper en arrière-plan : /health répond immédiatement,
+# /ready passe à 200 une fois le modèle chargé et chauffé
+model_manager = ModelManager(build_model_handle, MODEL_SIZE, COMPUTE_TYPE, on_publish=apply_model_layout)
+fallback_manager = ModelManager(build_fallback_handle, FALLBACK_MODEL_SIZE, COMPUTE_TYPE,
+                                name="secours") if FALLBACK_MODEL_SIZE else None
+
+# Sessions de transcription incrémentale
+streaming_sessions = StreamingSessionRegistry()
+
+# Contrôle d'admission : file bornée devant les décodeurs
+decoder_capacity = decoder_capacity_for(ASR_WORKERS)
+admission = AdmissionController(decoder_capacity, ASR_MAX_QUEUE)
+
+# Les workers "spawn" réimportent ce module : seul le processus principal charge le modèle
+if multiprocessing.parent_process() is None:
+    model_manager.start()
+    if fallback_manager:
+        fallback_manager.start()
+
+def decode_clip_fallback(audio_data: np.ndarray, **options) -> dict:
+    with fallback_manager.acquire() as handle:
+        return handle.decode(audio_data, **options)
+
+decoding_policy = DecodingPolicy(
+    decode_clip_fallback if fallback_manager else None,
+    fallback_ready=lambda: fallback_manager is not None and fallback_manager.ready
+)
+
+# Cache de transcriptions : la clé couvre tout ce qui influence le résultat
+transcription_cache = TranscriptionCache()
+
+def cache_params() -> tuple:
+    return (model_manager.model_size, model_manager.compute_type, "fr",
+            POLICY_ENABLED, FALLBACK_MODEL_SIZE, VAD_ENABLED)
+
+# Métriques Prometheus (/metrics)
+metrics = MetricsRegistry()
+METERED_ENDPOINTS = {'/asr', '/asr/raw', '/transcribe', '/v1/audio/transcriptions', '/asr/jobs',
+                     '/asr/stream', '/asr/stream/<session_id>', '/asr/stream/<session_id>/end'}
+
+def run_transcription(audio_data: np.ndarray, timings: dict = None,
+                      priority: str = PRIORITY_INTERACTIVE) -> dict:
+    """Transcrit un clip 16 kHz mono selon la politique de décodage
+
+    Lève QueueFullError si la file d'attente est pleine et ModelNotReadyError
+    si aucun modèle n'est encore chargé. `timings` cumule l'attente en file
+    et la durée de décodage (s).
+    """
+    with admission.slot(priority) as queue_wait, model_manager.acquire() as handle:
+        decode_start = time.perf_counter()
+        result = decoding_policy.transcribe(audio_data, handle.decode, queue_depth=admission.waiting)
+        if timings is not None:
+            timings["queue_wait"] = timings.get("queue_wait", 0.0) + queue_wait
+            timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - decode_start
+        return result
+
+def request_priority(default: str = PRIORITY_INTERACTIVE) -> str:
+    """Classe de priorité : en-tête X-Priority (interactive | batch), sinon celle de l'endpoint"""
+    priority = request.headers.get('X-Priority', default).strip().lower()
+    return priority if priority in PRIORITIES else default
+
+def _metrics_endpoint() -> str:
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def reject_oversized_upload():
+    """413 avant lecture du corps si Content-Length dépasse la limite de la route"""
+    limit = request.max_content_length
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        return _too_large_response()
+
+def _too_large_response():
+    return jsonify({"error": "Payload too large", "max_bytes": request.max_content_length}), 413
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_too_large(e):
+    # Corps sans Content-Length (chunked) dépassant la limite pendant la lecture
+    return _too_large_response()
+
+@app.after_request
+def record_request_metrics(response):
+    """Rejets et erreurs des endpoints de transcription"""
+    endpoint = _metrics_endpoint()
+    if endpoint in METERED_ENDPOINTS:
+        if response.status_code == 503:
+            metrics.inc("asr_requests_rejected_total", endpoint=endpoint,
+                        reason=g.get("reject_reason", "not_ready"))
+        elif response.status_code >= 400:
+            metrics.inc("asr_requests_errors_total", endpoint=endpoint,
+                        kind="server" if response.status_code >= 500 else "client")
+    return response
+
+# Jobs de transcription longue : morceaux décodés en parallèle sur les décodeurs
+# (parallélisme relu à chaque job sur la capacité d'admission courante)
+transcription_jobs = JobManager(lambda audio, priority: run_transcription(audio, priority=priority),
+                                lambda: admission.capacity)
+
+def _not_ready_response():
+    return jsonify({"error": "Whisper model not available", "model": model_manager.status()}), 503, \
+        {"Retry-After": "5"}
 
 @app.route('/')
 def home():
     return jsonify({
         "service": "ASR Service avec Faster-Whisper",
         "version": "1.0",
-        "model": MODEL_SIZE,
+        "model": model_manager.model_size,
         "device": DEVICE,
-        "status": "ready" if whisper_model else "error"
+        "streaming": {"http": "/asr/stream", "websocket": "/asr/ws" if WEBSOCKET_AVAILABLE else None},
+        "status": "ready" if model_manager.ready else model_manager.state
     })
 
 @app.route('/health')
 def health():
-    """Health check endpoint"""
-    if whisper_model:
-        return jsonify({"status": "healthy", "model": MODEL_SIZE}), 200
+    """Health check endpoint (processus vivant, modèle éventuellement en chargement)"""
+    return jsonify({"status": "healthy", "model": model_manager.status()}), 200
+
+@app.route('/ready')
+def ready():
+    """Readiness : modèle chargé et chauffé"""
+    if model_manager.ready:
+        return jsonify({"status": "ready", "model": model_manager.status()}), 200
+    return jsonify({"status": "not_ready", "model": model_manager.status()}), 503
+
+def _admin_authorized() -> bool:
+    token = os.getenv('ASR_ADMIN_TOKEN')
+    return not token or request.headers.get('X-Admin-Token') == token
+
+@app.route('/admin/model', methods=['GET', 'POST'])
+def admin_model():
+    """Charge un autre modèle à côté de l'actuel et le publie une fois chauffé
+
+    POST {"model_size": "small", "compute_type": "int8"} ; GET pour l'état.
+    """
+    if not _admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    if request.method == 'GET':
+        return jsonify(model_manager.status())
+
+    data = request.get_json(silent=True) or {}
+    model_size = data.get('model_size', model_manager.model_size)
+    compute_type = data.get('compute_type', model_manager.compute_type)
+    try:
+        swap = model_manager.request_swap(model_size, compute_type)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    logger.info(f"🔄 Remplacement du modèle demandé: {model_size}/{compute_type}")
+    return jsonify(swap), 202
+
+def memory_report() -> dict:
+    """Mémoire du processus principal et, en mode pool, de chaque worker (USS = pages propres)"""
+    handle = model_manager.current
+    report = {"main": process_memory()}
+    if handle and isinstance(handle.model, ProcessWorkerPool):
+        report["workers"] = {str(pid): process_memory(pid) for pid in handle.model.worker_pids()}
+    return report
+
+@app.route('/stats')
+def stats():
+    """Statistiques internes (file d'attente, lots, sessions de streaming)"""
+    handle = model_manager.current
+    batch_scheduler = handle.batch_scheduler if handle else None
+    return jsonify({
+        "model": model_manager.status(),
+        "batching": dict(
+            batch_scheduler.stats.snapshot(),
+            enabled=True,
+            window_ms=BATCH_WINDOW_MS,
+            queue_depth=batch_scheduler.queue_depth()
+        ) if batch_scheduler else {"enabled": False},
+        "workers": dict(
+            admission.snapshot(),
+            mode=("shared_replicas" if ASR_WORKER_MODE == 'shared' else "process_pool")
+            if active_layout["workers"] > 0 else "in_process",
+            workers=active_layout["workers"] or 1,
+            threads_per_worker=active_layout["threads"] or "auto",
+            layout_source=active_layout["source"]
+        ),
+        "decoding_policy": decoding_policy.snapshot(),
+        "cache": transcription_cache.snapshot(),
+        "jobs": transcription_jobs.snapshot(),
+        "memory": memory_report(),
+        "streaming_sessions": len(streaming_sessions)
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métriques au format texte Prometheus"""
+    admission_state = admission.snapshot()
+    cache_state = transcription_cache.snapshot()
+    gauges = [
+        ("asr_model_ready", "Modèle principal chargé et chauffé", int(model_manager.ready), None),
+        ("asr_queue_depth", "Requêtes en attente d'un décodeur", admission_state["queue_depth"], None),
+        ("asr_active_decodes", "Décodages en cours", admission_state["active"], None),
+        ("asr_decoder_capacity", "Décodeurs concurrents", admission_state["capacity"], None),
+        ("asr_cache_entries", "Entrées du cache de transcriptions", cache_state["entries"], None),
+        ("asr_cache_hit_ratio", "Taux de succès du cache de transcriptions", cache_state["hit_rate"], None),
+        ("asr_streaming_sessions", "Sessions de streaming ouvertes", len(streaming_sessions), None),
+    ]
+    memory = memory_report()
+    for process, usage in [("main", memory["main"])] + sorted(memory.get("workers", {}).items()):
+        for kind, value in usage.items():
+            gauges.append(("asr_process_memory_bytes", "Mémoire par processus (rss, pss, uss)", value,
+                           {"process": process, "kind": kind}))
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+def transcribe_chunked(audio_data: np.ndarray, timings: dict = None,
+                       priority: str = PRIORITY_INTERACTIVE) -> dict:
+    """Clip long découpé aux pauses ; un décodeur est réservé par morceau
+
+    Une requête longue libère ainsi le décodeur entre deux morceaux et les
+    requêtes interactives en attente passent avant le morceau suivant.
+    """
+    results = []
+    segments = []
+    for position, audio, _, regions in iter_chunks(lambda start, count: audio_data[start:start + count],
+                                                   len(audio_data)):
+        result = run_transcription(audio, timings, priority)
+        results.append(result)
+        segments.extend(chunk_segments(result, position, regions))
+    if not results:
+        return {"text": "", "language": "fr", "language_probability": 0.0, "segments": []}
+    weights = [max(len(r["text"]), 1) for r in results]
+    policies = {r.get("decode_policy") for r in results}
+    return dict(
+        results[0],
+        text=" ".join(r["text"] for r in results if r["text"]).strip(),
+        avg_logprob=float(np.average([r.get("avg_logprob", 0.0) for r in results], weights=weights)),
+        no_speech_prob=max(r.get("no_speech_prob", 0.0) for r in results),
+        decode_policy=policies.pop() if len(policies) == 1 else "mixed",
+        segments=segments,
+        chunks=len(results)
+    )
+
+def transcribe_pipeline(audio_data: np.ndarray, timings: dict = None,
+                        priority: str = PRIORITY_INTERACTIVE) -> dict:
+    """VAD puis décodage d'un clip 16 kHz mono"""
+    # VAD : rejet des clips sans parole, suppression des silences de bord et du bruit
+    speech_segments = None
+    input_duration = len(audio_data) / TARGET_SAMPLE_RATE
+    if VAD_ENABLED:
+        regions = detect_speech(audio_data)
+        speech_segments = regions_to_seconds(regions)
+        if not regions:
+            logger.info("🔇 Aucune parole détectée, décodage ignoré")
+            return {
+                "text": "",
+                "language": "fr",
+                "language_probability": 0.0,
+                "duration": round(input_duration, 3),
+                "speech_segments": []
+            }
+
+    # Transcription avec Whisper
+    logger.info("🔄 Transcription en cours...")
+    if VAD_ENABLED and input_duration > JOB_CHUNK_MAX_SECONDS:
+        result = transcribe_chunked(audio_data, timings, priority)
     else:
-        return jsonify({"status": "unhealthy", "error": "Whisper model not loaded"}), 503
+        if VAD_ENABLED:
+            audio_data = trim_to_speech(audio_data, regions)
+        result = run_transcription(audio_data, timings, priority)
+        if VAD_ENABLED:
+            result["segments"] = restore_timestamps(result.get("segments", []), regions)
+
+    if speech_segments is not None:
+        result["speech_segments"] = speech_segments
+        result["duration"] = round(input_duration, 3)
+    return result
+
+def _transcribe_response(audio_data: np.ndarray, sample_rate: int):
+    """Chemin commun en mémoire : float32 mono 16 kHz -> cache -> VAD -> Whisper
+
+    `sample_rate` est la fréquence d'origine, rapportée dans la réponse.
+    """
+    logger.info(f"📊 Audio lu: {len(audio_data)} échantillons 16 kHz (origine {sample_rate}Hz)")
+    endpoint = _metrics_endpoint()
+    audio_seconds = len(audio_data) / TARGET_SAMPLE_RATE
+    metrics.observe("asr_upload_decode_seconds", time.perf_counter() - g.request_started, endpoint=endpoint)
+    metrics.observe("asr_audio_duration_seconds", audio_seconds, endpoint=endpoint)
+
+    key = audio_fingerprint(audio_data, cache_params())
+    timings = {}
+    priority = request_priority()
+    try:
+        result = transcription_cache.get_or_compute(key, lambda: transcribe_pipeline(audio_data, timings, priority))
+    except ModelNotReadyError:
+        return _not_ready_response()
+    except QueueFullError as e:
+        g.reject_reason = "queue_full"
+        logger.warning(f"⛔ File ASR pleine, requête rejetée (Retry-After: {e.retry_after}s)")
+        return jsonify({"error": "ASR service overloaded", "retry_after": e.retry_after}), 503, \
+            {"Retry-After": str(e.retry_after)}
+    logger.info(f"✅ Transcription réussie: '{result['text']}'" + (" (cache)" if result.get("cached") else ""))
+    result["input_sample_rate"] = sample_rate
+
+    # Pas de mesure de décodage pour les succès de cache et les clips sans parole
+    policy = result.get("decode_policy", "vad_skipped")
+    metrics.inc("asr_requests_total", endpoint=endpoint, decode_policy=policy,
+                cache="hit" if result.get("cached") else "miss")
+    if not result["text"]:
+        metrics.inc("asr_requests_empty_total", endpoint=endpoint, decode_policy=policy)
+    if "decode" in timings:
+        metrics.observe("asr_queue_wait_seconds", timings["queue_wait"], endpoint=endpoint, priority=priority)
+        metrics.observe("asr_model_decode_seconds", timings["decode"], endpoint=endpoint, decode_policy=policy)
+        if audio_seconds > 0:
+            metrics.observe("asr_real_time_factor", timings["decode"] / audio_seconds,
+                            endpoint=endpoint, decode_policy=policy)
+
+    # Réponse compatible avec l'agent
+    return jsonify(result)
 
 @app.route('/asr', methods=['POST'])
 def transcribe_audio():
@@ -57,8 +452,8 @@ def transcribe_audio():
     try:
         logger.info("🎤 Nouvelle demande de transcription")
         
-        if not whisper_model:
-            return jsonify({"error": "Whisper model not available"}), 503
+        if not model_manager.ready:
+            return _not_ready_response()
         
         # Vérifier la présence du fichier audio
         if 'audio' not in request.files:
@@ -68,51 +463,48 @@ def transcribe_audio():
         if audio_file.filename == '':
             return jsonify({"error": "No audio file selected"}), 400
         
-        # Sauvegarder temporairement le fichier
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            audio_file.save(temp_file.name)
-            temp_path = temp_file.name
+        # Décodage en mémoire (WAV, FLAC, OGG/Opus, WebM/Opus) et rééchantillonnage par blocs
+        audio_data, sample_rate = decode_to_model_rate(audio_file.stream)
+        return _transcribe_response(audio_data, sample_rate)
+        
+    except AudioDecodeError as e:
+        return jsonify({"error": str(e)}), 400
+    except RequestEntityTooLarge:
+        return _too_large_response()
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la transcription: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/asr/raw', methods=['POST'])
+def transcribe_raw_pcm():
+    """Transcription de PCM brut s16le (application/octet-stream)
+
+    En-têtes : X-Sample-Rate (défaut 16000), X-Channels (défaut 1).
+    """
+    try:
+        if not model_manager.ready:
+            return _not_ready_response()
         
         try:
-            # Lire l'audio avec soundfile
-            audio_data, sample_rate = sf.read(temp_path)
-            logger.info(f"📊 Audio lu: {len(audio_data)} échantillons, {sample_rate}Hz")
-            
-            # Convertir en mono si nécessaire
-            if len(audio_data.shape) > 1:
-                audio_data = np.mean(audio_data, axis=1)
-            
-            # Transcription avec Whisper
-            logger.info("🔄 Transcription en cours...")
-            segments, info = whisper_model.transcribe(
-                audio_data,
-                language="fr",  # Français par défaut
-                beam_size=5,
-                best_of=5,
-                temperature=0.0
-            )
-            
-            # Extraire le texte
-            text = ""
-            for segment in segments:
-                text += segment.text + " "
-            
-            text = text.strip()
-            logger.info(f"✅ Transcription réussie: '{text}'")
-            
-            # Réponse compatible avec l'agent
-            return jsonify({
-                "text": text,
-                "language": info.language,
-                "language_probability": info.language_probability,
-                "duration": info.duration
-            })
-            
-        finally:
-            # Nettoyer le fichier temporaire
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-                
+            sample_rate = int(request.headers.get('X-Sample-Rate', 16000))
+            channels = int(request.headers.get('X-Channels', 1))
+        except ValueError:
+            return jsonify({"error": "Invalid X-Sample-Rate or X-Channels header"}), 400
+        if sample_rate <= 0:
+            return jsonify({"error": "Invalid X-Sample-Rate header"}), 400
+        
+        pcm_bytes = request.get_data(cache=False)
+        if not pcm_bytes:
+            return jsonify({"error": "No audio data provided"}), 400
+        
+        logger.info("🎤 Nouvelle demande de transcription PCM brut")
+        audio_data = to_model_rate(pcm16_to_float32(pcm_bytes, channels), sample_rate)
+        return _transcribe_response(audio_data, sample_rate)
+        
+    except AudioDecodeError as e:
+        return jsonify({"error": str(e)}), 400
+    except RequestEntityTooLarge:
+        return _too_large_response()
     except Exception as e:
         logger.error(f"❌ Erreur lors de la transcription: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
@@ -127,6 +519,208 @@ def transcribe_openai_style():
     """Endpoint style OpenAI pour compatibilité"""
     return transcribe_audio()
 
+@app.route('/asr/jobs', methods=['POST'])
+def job_submit():
+    """Soumet un enregistrement long (priorité batch par défaut) ; suivi par /asr/jobs/<job_id>"""
+    # Même contrôle que /asr : rien n'est spoolé tant que le modèle n'est pas prêt
+    if not model_manager.ready:
+        return _not_ready_response()
+    if 'audio' not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+    audio_file = request.files['audio']
+    try:
+        job = transcription_jobs.submit(audio_file.stream, audio_file.filename or None,
+                                        request_priority(PRIORITY_BATCH))
+    except AudioDecodeError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        g.reject_reason = "job_limit"
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    return jsonify({
+        "job_id": job.job_id,
+        "duration": round(job.duration, 3),
+        "status_url": f"/asr/jobs/{job.job_id}",
+        "events_url": f"/asr/jobs/{job.job_id}/events"
+    }), 202
+
+@app.route('/asr/jobs/<job_id>')
+def job_status(job_id):
+    """État, avancement et, une fois terminé, transcription complète"""
+    job = transcription_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown transcription job"}), 404
+    return jsonify(job.status())
+
+@app.route('/asr/jobs/<job_id>/events')
+def job_events(job_id):
+    """Avancement en Server-Sent Events jusqu'à la fin du job"""
+    job = transcription_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown transcription job"}), 404
+
+    def events():
+        version = -1
+        while True:
+            current = job.wait_for_change(version, timeout=15)
+            if current == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            status = job.status()
+            yield f"event: {status['state']}\ndata: {json.dumps(status)}\n\n"
+            if job.finished:
+                return
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _stream_options(source) -> dict:
+    """Paramètres de session lus depuis les en-têtes ou un message JSON ; ValueError si invalides"""
+    options = {
+        "sample_rate": int(source.get('sample_rate', source.get('X-Sample-Rate', 16000))),
+        "channels": int(source.get('channels', source.get('X-Channels', 1))),
+        "language": source.get('language', source.get('X-Language', 'fr'))
+    }
+    if options["sample_rate"] <= 0 or options["channels"] <= 0:
+        raise ValueError("sample_rate and channels must be positive")
+    return options
+
+@contextmanager
+def stream_decoder():
+    """Un pas de décodage streaming : place interactive dans la file d'admission et modèle courant
+
+    Lève QueueFullError ou ModelNotReadyError comme run_transcription.
+    """
+    with admission.slot(PRIORITY_INTERACTIVE), model_manager.acquire() as handle:
+        yield handle.model
+
+def _stream_overloaded_response(e: QueueFullError):
+    g.reject_reason = "queue_full"
+    return jsonify({"error": "ASR service overloaded", "retry_after": e.retry_after}), 503, \
+        {"Retry-After": str(e.retry_after)}
+
+@app.route('/asr/stream', methods=['POST'])
+def stream_open():
+    """Ouvre une session de transcription incrémentale (transport HTTP par morceaux)"""
+    if not model_manager.ready:
+        return _not_ready_response()
+    try:
+        session = streaming_sessions.create(stream_decoder, **_stream_options(request.headers))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid stream parameters: {e}"}), 400
+    except RuntimeError as e:
+        g.reject_reason = "session_limit"
+        return jsonify({"error": str(e)}), 503
+    logger.info(f"📡 Session de streaming ouverte: {session.session_id}")
+    return jsonify({"session_id": session.session_id}), 201
+
+@app.route('/asr/stream/<session_id>', methods=['POST'])
+def stream_push(session_id):
+    """Pousse des trames PCM s16le et renvoie l'hypothèse partielle"""
+    session = streaming_sessions.get(session_id)
+    if not session:
+        return jsonify({"error": "Unknown streaming session"}), 404
+    try:
+        return jsonify(session.push(request.get_data()))
+    except QueueFullError as e:
+        return _stream_overloaded_response(e)
+    except ModelNotReadyError:
+        return _not_ready_response()
+    except RequestEntityTooLarge:
+        return _too_large_response()
+    except Exception as e:
+        logger.error(f"❌ Erreur streaming: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/asr/stream/<session_id>/end', methods=['POST'])
+def stream_end(session_id):
+    """Termine l'énoncé et renvoie la transcription finale
+
+    Sur 503 (file pleine), la session reste ouverte : la fin peut être renvoyée.
+    """
+    session = streaming_sessions.get(session_id)
+    if not session:
+        return jsonify({"error": "Unknown streaming session"}), 404
+    try:
+        if request.content_length:
+            session.push(request.get_data())
+        result = session.finish()
+        streaming_sessions.close(session_id)
+        logger.info(f"✅ Transcription streaming finale: '{result['text']}'")
+        return jsonify(result)
+    except QueueFullError as e:
+        return _stream_overloaded_response(e)
+    except ModelNotReadyError:
+        return _not_ready_response()
+    except RequestEntityTooLarge:
+        return _too_large_response()
+    except Exception as e:
+        streaming_sessions.close(session_id)
+        logger.error(f"❌ Erreur streaming: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+if WEBSOCKET_AVAILABLE:
+    @sock.route('/asr/ws')
+    def stream_websocket(ws):
+        """Transcription incrémentale par WebSocket
+
+        Messages texte JSON : {"event": "start", "sample_rate": 48000, ...} puis
+        {"event": "end"} ; messages binaires : trames PCM s16le. Les erreurs
+        (message invalide, file pleine, limite de sessions) sont renvoyées en
+        événements {"type": "error"} sans fermer la connexion.
+        """
+        if not model_manager.ready:
+            ws.send(json.dumps({"type": "error", "error": "Whisper model not available"}))
+            return
+        session = None
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                try:
+                    session = _stream_websocket_message(ws, session, message)
+                except (ValueError, TypeError) as e:
+                    ws.send(json.dumps({"type": "error", "error": f"Invalid stream event: {e}"}))
+                except QueueFullError as e:
+                    ws.send(json.dumps({"type": "error", "error": "ASR service overloaded",
+                                        "retry_after": e.retry_after}))
+                except ModelNotReadyError:
+                    ws.send(json.dumps({"type": "error", "error": "Whisper model not available"}))
+                except RuntimeError as e:
+                    ws.send(json.dumps({"type": "error", "error": str(e)}))
+        finally:
+            if session is not None:
+                streaming_sessions.close(session.session_id)
+
+    def _stream_websocket_message(ws, session, message):
+        """Traite un message WebSocket ; renvoie la session courante (None après "end")"""
+        if isinstance(message, str):
+            event = json.loads(message)
+            if not isinstance(event, dict):
+                raise ValueError("JSON object expected")
+            if event.get('event') == 'start' and session is None:
+                session = streaming_sessions.create(stream_decoder, **_stream_options(event))
+                ws.send(json.dumps({"type": "started", "session_id": session.session_id}))
+            elif event.get('event') == 'end' and session is not None:
+                ws.send(json.dumps(session.finish()))
+                streaming_sessions.close(session.session_id)
+                session = None
+            return session
+        if session is None:
+            session = streaming_sessions.create(stream_decoder)
+        partial = session.push(message)
+        if partial["decoded"]:
+            ws.send(json.dumps(partial))
+        return session
+
 if __name__ == '__main__':
     port = int(os.getenv('ASR_PORT', 8001))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    if WAITRESS_AVAILABLE:
+        # Frontal multi-thread : les threads HTTP ne font qu'attendre les décodeurs
+        # Avec calibration, le nombre de décodeurs n'est connu qu'après le chargement
+        capacity_hint = max(decoder_capacity, available_cores()) if AUTOTUNE_ENABLED else decoder_capacity
+        http_threads = int(os.getenv('ASR_HTTP_THREADS', capacity_hint + ASR_MAX_QUEUE + 4))
+        logger.info(f"🚀 Service ASR sur le port {port} (waitress, {http_threads} threads)")
+        serve(app, host='0.0.0.0', port=port, threads=http_threads)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latence et de débit du service TTS Piper
+
+Envoie un corpus de phrases françaises (courtes, moyennes, longues) au
+service, en mode fichier complet (/api/tts) et en flux (/api/tts/stream),
+pour chaque voix et chaque niveau de concurrence. Par défaut, chaque voix
+native n'est mesurée qu'une fois : les alias d'AVAILABLE_VOICES qui
+résolvent vers une voix déjà mesurée sont ignorés. Pour chaque combinaison :
+délai avant le premier octet (TTFB), latence totale p50/p90/p95/p99,
+facteur temps réel (temps de synthèse / durée audio), débit en caractères
+et en secondes d'audio par seconde.
+
+Par défaut le service est démarré dans ce processus, sur 127.0.0.1, avec le
+moteur natif et le cache audio désactivé : aucun accès réseau n'est
+nécessaire, seules les voix de PIPER_VOICES_DIR sont utilisées. Avec --url,
+le benchmark vise un service déjà lancé (désactiver son cache pour des
+mesures de synthèse, les réponses X-Cache: hit sont comptées à part).
+
+Usage :
+    python bench_tts.py --concurrency 1,2,4,8 --modes whole,stream --repeats 2
+    python bench_tts.py --url http://localhost:5002 --voices alloy,tom-fr-high
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CORPUS = {
+    "court": [
+        "Bonjour !",
+        "Très bien, continuez.",
+        "Pouvez-vous répéter ?",
+        "Excellent travail.",
+    ],
+    "moyen": [
+        "Bienvenue dans votre séance d'entraînement à la prise de parole en public.",
+        "Essayons maintenant un exercice de respiration, inspirez profondément.",
+        "Votre diction est claire, travaillons un peu plus le rythme de vos phrases.",
+        "Les chaussettes de l'archiduchesse sont-elles sèches, archi-sèches ?",
+    ],
+    "long": [
+        "Pour préparer un entretien d'embauche, commencez par présenter votre parcours en deux minutes, "
+        "en insistant sur les expériences qui correspondent au poste, puis laissez votre interlocuteur "
+        "rebondir sur ce qui l'intéresse.",
+        "Lorsque vous défendez une position dans un débat, annoncez d'abord votre thèse, appuyez-la sur "
+        "deux ou trois arguments concrets, répondez aux objections prévisibles et terminez par une "
+        "conclusion courte que votre auditoire retiendra.",
+    ],
+}
+
+# Chauffe sur une phrase hors corpus : elle n'amorce aucun cache pour les phrases mesurées
+WARMUP_TEXT = "Phrase de chauffe du banc de mesure, jamais mesurée."
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_corpus(path: str = None) -> list:
+    """[(catégorie, phrase), ...] : corpus intégré ou fichier (une phrase par ligne)"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [("fichier", line.strip()) for line in f if line.strip()]
+    return [(category, text) for category, texts in CORPUS.items() for text in texts]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_service(engine: str):
+    """Service TTS dans ce processus, sur la boucle locale ; renvoie (url, serveur uvicorn)"""
+    # Mesure de la synthèse : ni cache, ni pré-calcul, ni refus sur échéance. Valeurs
+    # imposées, y compris dans l'image où docker-compose définit déjà ces variables
+    os.environ["TTS_ENGINE"] = engine
+    os.environ["TTS_CACHE_MEMORY_MB"] = "0"
+    os.environ["TTS_CACHE_DIR"] = ""
+    os.environ["TTS_CACHE_PRERENDER_FORMATS"] = ""
+    os.environ["TTS_INTERACTIVE_DEADLINE_MS"] = "600000"
+    os.environ["TTS_MAX_QUEUE"] = "1024"
+
+    import uvicorn
+    import tts_service_piper
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(tts_service_piper.app, host="127.0.0.1", port=port,
+                                           log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Le service TTS local n'a pas démarré")
+        time.sleep(0.05)
+    if engine == "native" and not tts_service_piper.piper_engine.available:
+        raise RuntimeError(f"Aucune voix Piper native dans {os.getenv('PIPER_VOICES_DIR', '/app/voices')}")
+    return f"http://127.0.0.1:{port}", server
+
+
+async def timed_request(client, url: str, mode: str, text: str, voice: str, sample_rate: int) -> dict:
+    """Une synthèse : TTFB, latence totale, durée audio"""
+    endpoint = "/api/tts/stream" if mode == "stream" else "/api/tts"
+    payload = {"text": text, "voice": voice, "format": "pcm_s16le"}
+    if sample_rate:
+        payload["sample_rate"] = sample_rate
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    async with client.stream("POST", f"{url}{endpoint}", json=payload,
+                             headers={"X-Priority": "interactive"}) as response:
+        async for chunk in response.aiter_raw():
+            if chunk and ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+        latency = time.perf_counter() - start
+        rate = int(response.headers.get("X-Sample-Rate") or sample_rate or 0)
+        return {
+            "status": response.status_code,
+            "cache": response.headers.get("X-Cache"),
+            "voice": response.headers.get("X-Audio-Voice", voice),
+            "ttfb": ttfb if ttfb is not None else latency,
+            "latency": latency,
+            "audio_seconds": size / 2 / rate if rate and response.status_code == 200 else 0.0,
+            "chars": len(text)
+        }
+
+
+async def run_level(client, url: str, mode: str, voice: str, corpus: list, concurrency: int,
+                    repeats: int, sample_rate: int) -> dict:
+    """Toutes les phrases x répétitions, `concurrency` requêtes en vol"""
+    jobs = asyncio.Queue()
+    for _ in range(repeats):
+        for item in corpus:
+            jobs.put_nowait(item)
+    samples = []
+
+    async def worker():
+        while not jobs.empty():
+            _, text = jobs.get_nowait()
+            try:
+                samples.append(await timed_request(client, url, mode, text, voice, sample_rate))
+            except Exception as e:
+                samples.append({"status": 0, "error": str(e)})
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - wall_start
+
+    ok = [s for s in samples if s["status"] == 200 and s.get("cache") != "hit"]
+    result = {
+        "voice": voice,
+        "resolved_voice": ok[0]["voice"] if ok else None,
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": sum(s["status"] not in (200, 503) for s in samples),
+        "rejected": sum(s["status"] == 503 for s in samples),
+        "cache_hits": sum(s.get("cache") == "hit" for s in samples),
+        "wall_seconds": round(wall, 3)
+    }
+    if not ok:
+        return result
+
+    latencies = [s["latency"] for s in ok]
+    ttfbs = [s["ttfb"] for s in ok]
+    audio_seconds = sum(s["audio_seconds"] for s in ok)
+    for p in PERCENTILES:
+        result[f"latency_p{p}_ms"] = round(float(np.percentile(latencies, p)) * 1000, 1)
+    result["ttfb_p50_ms"] = round(float(np.percentile(ttfbs, 50)) * 1000, 1)
+    result["ttfb_p95_ms"] = round(float(np.percentile(ttfbs, 95)) * 1000, 1)
+    result["audio_seconds"] = round(audio_seconds, 2)
+    # RTF par requête (temps de synthèse / durée produite), moyenné sur les octets d'audio
+    result["rtf"] = round(sum(latencies) / audio_seconds, 4) if audio_seconds else None
+    result["chars_per_second"] = round(sum(s["chars"] for s in ok) / wall, 1)
+    result["audio_seconds_per_second"] = round(audio_seconds / wall, 2)
+    return result
+
+
+async def run_benchmark(url: str, args) -> list:
+    import httpx
+
+    corpus = load_corpus(args.corpus)
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        dedupe = not args.voices
+        if args.voices:
+            voices = parse_list(args.voices)
+        else:
+            # Voix natives du service, à défaut AVAILABLE_VOICES (alias dédoublonnés ci-dessous)
+            catalog = (await client.get(f"{url}/api/voices")).json()
+            voices = [voice['id'] for voice in catalog.get('native_voices') or catalog['available_voices']]
+        measured = {}
+        for voice in voices:
+            # Chauffe : première inférence de la voix hors mesure, qui donne aussi la voix résolue
+            resolved = voice
+            for _ in range(max(args.warmup, 1 if dedupe else 0)):
+                resolved = (await timed_request(client, url, "whole", WARMUP_TEXT, voice,
+                                                args.sample_rate))["voice"]
+            if dedupe and resolved in measured:
+                print(f"⏭️ {voice} : même voix que {measured[resolved]} ({resolved}), ignorée", flush=True)
+                continue
+            measured[resolved] = voice
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    print(f"⏱️ {voice} / {mode} / concurrence {concurrency}...", flush=True)
+                    results.append(await run_level(client, url, mode, voice, corpus, concurrency,
+                                                   args.repeats, args.sample_rate))
+    return results
+
+
+def print_table(results: list):
+    columns = [("voice", 12), ("mode", 6), ("concurrency", 5), ("ttfb_p50_ms", 9), ("ttfb_p95_ms", 9),
+               ("latency_p50_ms", 9), ("latency_p95_ms", 9), ("latency_p99_ms", 9), ("rtf", 7),
+               ("chars_per_second", 8), ("errors", 5)]
+    headers = ["voix", "mode", "conc", "TTFB p50", "TTFB p95", "p50 ms", "p95 ms", "p99 ms", "RTF",
+               "car./s", "err"]
+    print("  ".join(h.ljust(w) for h, (_, w) in zip(headers, columns)))
+    print("  ".join("-" * w for _, w in columns))
+    for result in results:
+        print("  ".join(str(result.get(key, "")).ljust(width) for key, width in columns))
+
+
+def parse_list(value: str, cast=str) -> list:
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTFB / latence / RTF / débit du service TTS")
+    parser.add_argument("--url", default=None, help="Service déjà lancé (par défaut : service local en processus)")
+    parser.add_argument("--engine", default="native", choices=["native", "openedai", "auto"],
+                        help="Moteur du service local")
+    parser.add_argument("--voices", default=None, help="Voix testées (défaut : voix natives du service, sinon AVAILABLE_VOICES sans alias)")
+    parser.add_argument("--modes", default="whole,stream")
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1, help="Requêtes de chauffe par voix")
+    parser.add_argument("--sample-rate", type=int, default=None, help="Fréquence de sortie (défaut : voix)")
+    parser.add_argument("--corpus", default=None, help="Fichier texte, une phrase par ligne")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default="tts_benchmark.json")
+    args = parser.parse_args()
+    args.modes = parse_list(args.modes)
+    args.concurrency = parse_list(args.concurrency, int)
+    if set(args.modes) - {"whole", "stream"}:
+        parser.error("Modes : whole, stream")
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = None
+    url = args.url
+    if url is None:
+        url, server = start_local_service(args.engine)
+    try:
+        results = asyncio.run(run_benchmark(url.rstrip("/"), args))
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "service": args.url or f"local ({args.engine})",
+        "corpus": args.corpus or "intégré",
+        "repeats": args.repeats,
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print_table(results)
+    print(f"\n📄 Rapport JSON: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test du cache G2P : avec un cache froid comme avec un cache chaud (texte
+recomposé à partir des mots appris), la sortie doit être exactement celle
+d'espeak sur le texte entier, ponctuation, fins de phrase et frontières de
+liaison comprises.
+
+Les règles attendues (initiales qui lient, ponctuation, découpage en
+phrases) sont écrites ici, indépendamment des tables de tts_phonemes. Les
+tests marqués `espeak` utilisent le vrai espeak-ng (piper-phonemize) et sont
+ignorés s'il est absent.
+
+Usage :
+    python -m pytest backend/services/test_tts_phonemes.py
+"""
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tts_phonemes import PhonemeCache, word_plan
+
+try:
+    from tts_engine_piper import PHONEMIZER_AVAILABLE, _phonemize_espeak
+except ImportError:
+    PHONEMIZER_AVAILABLE = False
+
+requires_espeak = pytest.mark.skipif(not PHONEMIZER_AVAILABLE, reason="espeak-ng (piper-phonemize) absent")
+
+VOICE = "fr"
+
+# Faux espeak : règles de contexte du français, définies sans les tables du module testé
+FAKE_TOKEN_RE = re.compile(r"\w+(?:['’-]\w+)*|[^\w\s]")
+FAKE_VOWELS = "aàâäeéèêëiîïoôöuùûüyÿœæh"
+FAKE_PUNCTUATION = ",;:.!?"
+SILENT_FINALS = {"s": "z", "x": "z", "t": "t", "d": "t"}
+
+# Chaque mot des textes cibles est appris ici, dans un contexte sans liaison
+WARMUP = [
+    "Bonjour madame.",
+    "Comment va votre diction ?",
+    "Très bien, merci.",
+    "Nous parlons plus lentement.",
+    "Les trois candidats sont prêts.",
+    "Nous sommes là.",
+    "Mes collègues, amis !",
+    "Demain, arrivent trois candidats.",
+    "Oui, avons fini.",
+    "Madame, une semaine.",
+    "Encore merci.",
+    "Chaque semaine, nous progressons.",
+    "Allons-y vite.",
+]
+
+COMPOSABLE = [
+    "Bonjour, madame ; comment va votre diction ?",
+    "Merci madame, très bien.",
+    "Nous sommes prêts, allons-y !",
+    "Chaque semaine nous parlons plus lentement.",
+]
+
+CONTEXTUAL = [
+    # Liaison, élision ou enchaînement
+    "Les amis arrivent.",
+    "Nous avons trois amis.",
+    "Encore une semaine.",
+    "Mes amis, allons-y.",
+    # Plusieurs phrases, ou abréviation que le faux espeak ne coupe pas
+    "Bonjour madame. Merci.",
+    "Merci, etc. et bonjour.",
+]
+
+
+def fake_espeak(text: str, voice: str) -> list:
+    """Phrases coupées après . ! ? suivis d'une majuscule ; liaison et élision selon le mot suivant"""
+    tokens = FAKE_TOKEN_RE.findall(text)
+    sentences, words = [], []
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if token in FAKE_PUNCTUATION:
+            words[-1] += token
+            if token in ".!?" and following[:1].isupper():
+                sentences.append(" ".join(words))
+                words = []
+            continue
+        word = token.lower()
+        linked = following[:1].lower() in FAKE_VOWELS
+        if word[-1] in SILENT_FINALS:
+            word = word[:-1] + (SILENT_FINALS[word[-1]] if linked else "")
+        elif word.endswith("e") and linked:
+            word = word[:-1]
+        words.append(word.replace("qu", "k").replace("ch", "ʃ").replace("on", "ɔ̃"))
+    if words:
+        sentences.append(" ".join(words))
+    return [list(sentence) for sentence in sentences]
+
+
+class CountingPhonemizer:
+    def __init__(self, phonemize=fake_espeak):
+        self.phonemize = phonemize
+        self.calls = []
+
+    def __call__(self, text: str, voice: str) -> list:
+        self.calls.append(text)
+        return self.phonemize(text, voice)
+
+
+def new_cache() -> PhonemeCache:
+    return PhonemeCache(max_sentences=1000, max_words=1000, word_level=True, path="")
+
+
+@pytest.fixture
+def warm_cache():
+    cache = new_cache()
+    phonemizer = CountingPhonemizer()
+    for text in WARMUP:
+        cache.phonemize(text, VOICE, phonemizer)
+    return cache
+
+
+@pytest.mark.parametrize("text", COMPOSABLE + CONTEXTUAL)
+def test_warm_word_cache_matches_cold(warm_cache, text):
+    cold_output = new_cache().phonemize(text, VOICE, CountingPhonemizer())
+    assert cold_output == fake_espeak(text, VOICE)
+
+    phonemizer = CountingPhonemizer()
+    warm_output = warm_cache.phonemize(text, VOICE, phonemizer)
+    assert warm_output == cold_output
+    # Une seconde lecture (niveau texte) ne change rien
+    assert warm_cache.phonemize(text, VOICE, phonemizer) == cold_output
+
+
+def test_word_cache_composes_only_safe_texts(warm_cache):
+    phonemizer = CountingPhonemizer()
+    for text in COMPOSABLE + CONTEXTUAL:
+        warm_cache.phonemize(text, VOICE, phonemizer)
+    # Textes sûrs recomposés sans espeak, les autres envoyés entiers à espeak
+    assert warm_cache.hits["word"] == len(COMPOSABLE)
+    assert phonemizer.calls == CONTEXTUAL
+
+
+@pytest.mark.parametrize("text", [
+    "Les amis", "Mes Amis", "Un homme", "Trois yeux", "Leurs œuvres", "Ces Échanges",
+    "Encore une", "Le hibou", "Bonjour. Merci", "Bonjour ! Merci", "Il est 10 heures", "Le PDG parle",
+])
+def test_word_plan_rejects_contextual_boundaries(text):
+    assert word_plan(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Bonjour madame.", "Les chats, amis.", "Merci ; encore bravo !", "Nous parlons vite ?",
+])
+def test_word_plan_accepts_safe_boundaries(text):
+    assert word_plan(text) is not None
+
+
+@pytest.mark.parametrize("output", [
+    "bɔ̃ʒuʁ ma dam.",  # découpe en mots différente du texte
+    "bɔ̃ʒuʁ madam",    # ponctuation absente de la sortie
+    "bɔ̃ʒuʁ .",         # mot vide
+])
+def test_unrecomposable_output_is_not_learned(output):
+    cache = new_cache()
+    phonemizer = CountingPhonemizer(lambda text, voice: [list(output)])
+    assert cache.phonemize("Bonjour madame.", VOICE, phonemizer) == [list(output)]
+    assert len(cache.words) == 0
+
+    # Mots inconnus : un autre texte avec les mêmes mots repasse par le phonémiseur
+    cache.phonemize("Madame bonjour.", VOICE, phonemizer)
+    assert phonemizer.calls == ["Bonjour madame.", "Madame bonjour."]
+    assert cache.hits["word"] == 0
+
+
+@requires_espeak
+@pytest.mark.parametrize("text", [
+    "M. Dupont est là. Merci.",
+    "Pommes, poires, etc. et le reste.",
+    "Bonjour. Merci.",
+    "Les amis arrivent à huit heures.",
+])
+def test_cold_cache_matches_espeak_on_whole_text(text):
+    assert new_cache().phonemize(text, VOICE, _phonemize_espeak) == _phonemize_espeak(text, VOICE)
+
+
+@requires_espeak
+def test_warm_word_cache_matches_espeak():
+    corpus = [
+        "Bonjour madame.", "Très bien, merci.", "Nous parlons plus lentement.",
+        "Le chat dort sur le canapé.", "Parlez plus fort, s'il vous plaît.",
+        "Votre diction est claire, travaillons le rythme.", "Le reste de la séance commence maintenant.",
+        "Pouvez-vous répéter la dernière phrase ?", "Merci pour votre patience.",
+        "Bonjour, madame ; comment va votre diction ?", "Parlez plus lentement, madame.",
+        "Le rythme de votre phrase est parfait.", "Merci madame, très bien.",
+    ]
+    cache = new_cache()
+    for text in corpus:
+        cache.phonemize(text, VOICE, _phonemize_espeak)
+    composed = 0
+    for text in corpus:
+        cache.sentences._entries.clear()
+        before = cache.hits["word"]
+        assert cache.phonemize(text, VOICE, _phonemize_espeak) == _phonemize_espeak(text, VOICE), text
+        composed += cache.hits["word"] - before
+    assert composed > 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
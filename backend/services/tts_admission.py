@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Admission prioritaire des synthèses du service TTS
+
+Deux classes, choisies par l'en-tête X-Priority (comme le service ASR) :
+- `interactive` (défaut de /api/tts et /api/tts/stream) : réponses en direct ;
+- `batch` (défaut de /api/tts/batch) : pré-calcul, préchargement, tests.
+
+Chaque synthèse (hors cache) réserve une place parmi TTS_CAPACITY, dans la
+limite du plafond de sa classe (TTS_INTERACTIVE_CONCURRENCY,
+TTS_BATCH_CONCURRENCY). Le plafond batch ne vaut que sous concurrence :
+tant qu'aucun interactif n'attend, un lot emprunte les places libres et
+garde tout le parallélisme de /api/tts/batch. Dès qu'un interactif attend,
+les batch ne dépassent plus leur plafond et les places qui se libèrent
+vont aux interactifs (attente bornée par la durée d'un élément de lot). La file est
+bornée (TTS_MAX_QUEUE) et chaque classe a une échéance d'attente
+(TTS_INTERACTIVE_DEADLINE_MS, TTS_BATCH_DEADLINE_MS) au-delà de laquelle
+la requête échoue tout de suite (503) plutôt que de produire un audio qui
+arriverait trop tard.
+"""
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from tts_batch import BATCH_WORKERS
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+# Configuration de l'admission
+TTS_CAPACITY = int(os.getenv('TTS_CAPACITY', '0')) or BATCH_WORKERS
+TTS_INTERACTIVE_CONCURRENCY = int(os.getenv('TTS_INTERACTIVE_CONCURRENCY', '0')) or TTS_CAPACITY
+TTS_BATCH_CONCURRENCY = int(os.getenv('TTS_BATCH_CONCURRENCY', '0')) or max(1, TTS_CAPACITY // 2)
+TTS_MAX_QUEUE = int(os.getenv('TTS_MAX_QUEUE', '64'))
+TTS_INTERACTIVE_DEADLINE_MS = float(os.getenv('TTS_INTERACTIVE_DEADLINE_MS', '2000'))
+TTS_BATCH_DEADLINE_MS = float(os.getenv('TTS_BATCH_DEADLINE_MS', '30000'))
+
+
+class AdmissionRejected(RuntimeError):
+    """File pleine ou échéance d'attente dépassée : réessayer plus tard (503)"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"TTS admission rejected ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Place réservée ; `release` est idempotent (flux interrompu, tâche de fond)"""
+
+    __slots__ = ("controller", "priority", "enqueued", "started", "waiter", "released")
+
+    def __init__(self, controller, priority: str):
+        self.controller = controller
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.started = None
+        self.waiter = asyncio.get_running_loop().create_future()
+        self.released = False
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started or time.monotonic()) - self.enqueued
+
+    def release(self):
+        if not self.released and self.started is not None:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """File bornée devant `capacity` synthèses, plafonds et échéances par classe
+
+    Toutes les opérations ont lieu dans la boucle d'événements : aucun verrou.
+    """
+
+    def __init__(self, capacity: int = TTS_CAPACITY, limits: dict = None, deadlines_ms: dict = None,
+                 max_queue: int = TTS_MAX_QUEUE):
+        self.capacity = max(1, capacity)
+        limits = limits or {PRIORITY_INTERACTIVE: TTS_INTERACTIVE_CONCURRENCY,
+                            PRIORITY_BATCH: TTS_BATCH_CONCURRENCY}
+        self.limits = {priority: max(1, min(self.capacity, limits[priority])) for priority in PRIORITIES}
+        deadlines_ms = deadlines_ms or {PRIORITY_INTERACTIVE: TTS_INTERACTIVE_DEADLINE_MS,
+                                        PRIORITY_BATCH: TTS_BATCH_DEADLINE_MS}
+        self.deadlines = {priority: deadlines_ms[priority] / 1000.0 for priority in PRIORITIES}
+        self.max_queue = max(0, max_queue)
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self.active = {priority: 0 for priority in PRIORITIES}
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {"queue_full": 0, "deadline": 0}
+        self.borrowed = 0
+        self._avg_service_time = 1.0
+
+    @property
+    def total_active(self) -> int:
+        return sum(self.active.values())
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + self.total_active) / self.capacity
+        return max(1, math.ceil(backlog * self._avg_service_time))
+
+    def _can_start(self, priority: str) -> bool:
+        if self.total_active >= self.capacity:
+            return False
+        if self.active[priority] < self.limits[priority]:
+            return True
+        # Emprunt des places libres par les batch, si aucun interactif n'attend
+        return priority == PRIORITY_BATCH and not self._queues[PRIORITY_INTERACTIVE]
+
+    def _dispatch(self):
+        """Attribue les places libres : interactifs d'abord, puis batch sous son plafond"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                ticket = queue.popleft()
+                self._start(ticket)
+                ticket.waiter.set_result(None)
+
+    def _start(self, ticket: Ticket):
+        ticket.started = time.monotonic()
+        if self.active[ticket.priority] >= self.limits[ticket.priority]:
+            self.borrowed += 1
+        self.active[ticket.priority] += 1
+        self.admitted[ticket.priority] += 1
+
+    def _release(self, ticket: Ticket):
+        elapsed = time.monotonic() - ticket.started
+        self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * elapsed
+        self.active[ticket.priority] -= 1
+        self._dispatch()
+
+    async def acquire(self, priority: str = PRIORITY_INTERACTIVE) -> Ticket:
+        """Place réservée, ou AdmissionRejected (file pleine, échéance dépassée)"""
+        ticket = Ticket(self, priority)
+        queue = self._queues[priority]
+        if not queue and self._can_start(priority):
+            self._start(ticket)
+            return ticket
+
+        # Les batch ne prennent la file que si elle n'est pas pleine ; un
+        # interactif n'est refusé que si la file contient déjà max_queue interactifs
+        queued = len(queue) if priority == PRIORITY_INTERACTIVE else self.waiting
+        if queued >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        queue.append(ticket)
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.waiter), self.deadlines[priority])
+        except asyncio.TimeoutError:
+            if ticket.started is None:
+                queue.remove(ticket)
+                self.rejected["deadline"] += 1
+                raise AdmissionRejected("deadline", self.retry_after())
+        except asyncio.CancelledError:
+            # Client parti pendant l'attente : place rendue si elle venait d'être attribuée
+            if ticket.started is None:
+                queue.remove(ticket)
+            ticket.release()
+            raise
+        return ticket
+
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_INTERACTIVE):
+        """Place réservée pour la durée du bloc ; renvoie le ticket (attente en file : queue_wait)"""
+        ticket = await self.acquire(priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "limits": dict(self.limits),
+            "deadlines_ms": {priority: round(d * 1000) for priority, d in self.deadlines.items()},
+            "active": dict(self.active),
+            "queue_depth_by_priority": {priority: len(queue) for priority, queue in self._queues.items()},
+            "max_queue": self.max_queue,
+            "admitted": dict(self.admitted),
+            "borrowed": self.borrowed,
+            "rejected": dict(self.rejected),
+            "avg_service_seconds": round(self._avg_service_time, 3)
+        }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Synthèse par lots du service TTS
+
+Les éléments d'un lot sont synthétisés en parallèle sur un pool de threads
+dédié, dimensionné sur les cœurs disponibles (TTS_BATCH_WORKERS) : ONNX
+Runtime libère le GIL pendant l'inférence, plusieurs phrases avancent donc
+en même temps sur la même session. Avec un pool large, TTS_ONNX_THREADS=1
+évite que chaque inférence réclame aussi tous les cœurs.
+
+Les résultats sont renvoyés dans l'ordre d'entrée, au fil de l'eau, dans
+l'un de deux conteneurs :
+- `length_prefixed` (défaut) : pour chaque élément, uint32 LE longueur +
+  métadonnées JSON, puis uint32 LE longueur + audio ;
+- `multipart` : multipart/mixed, une partie par élément, métadonnées dans
+  les en-têtes X-Item-*, encodées en pourcentages (UTF-8) hors ASCII
+  imprimable : un message d'erreur ou un texte renvoyé tel quel ne peut ni
+  couper la partie (CR/LF) ni y injecter d'en-tête.
+"""
+import os
+import json
+import struct
+import uuid
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Configuration des lots
+BATCH_WORKERS = int(os.getenv('TTS_BATCH_WORKERS', '0')) or _available_cores()
+BATCH_MAX_ITEMS = int(os.getenv('TTS_BATCH_MAX_ITEMS', '64'))
+
+BATCH_CONTAINERS = ("length_prefixed", "multipart")
+LENGTH_PREFIXED_MEDIA_TYPE = "application/x-tts-batch"
+
+# ASCII imprimable laissé tel quel dans les en-têtes X-Item-* (hors « % »)
+HEADER_SAFE = "".join(chr(c) for c in range(0x20, 0x7f) if chr(c) not in "%")
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="tts-batch")
+
+
+def length_prefixed_frame(meta: dict, data: bytes) -> bytes:
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    return struct.pack("<I", len(meta_bytes)) + meta_bytes + struct.pack("<I", len(data)) + data
+
+
+def read_length_prefixed(payload: bytes) -> list:
+    """[(métadonnées, audio), ...] depuis un corps `length_prefixed` complet"""
+    items, offset = [], 0
+    while offset < len(payload):
+        (meta_len,) = struct.unpack_from("<I", payload, offset)
+        meta = json.loads(payload[offset + 4:offset + 4 + meta_len])
+        offset += 4 + meta_len
+        (data_len,) = struct.unpack_from("<I", payload, offset)
+        items.append((meta, payload[offset + 4:offset + 4 + data_len]))
+        offset += 4 + data_len
+    return items
+
+
+def header_value(value) -> str:
+    """Valeur d'en-tête sans CR/LF ni caractère de contrôle (encodage en pourcentages)"""
+    return quote(str(value), safe=HEADER_SAFE)
+
+
+class MultipartWriter:
+    """Parties multipart/mixed produites une à une"""
+
+    def __init__(self):
+        self.boundary = f"tts-batch-{uuid.uuid4().hex}"
+
+    @property
+    def media_type(self) -> str:
+        return f"multipart/mixed; boundary={self.boundary}"
+
+    def part(self, meta: dict, data: bytes, content_type: str) -> bytes:
+        headers = [f"Content-Type: {content_type}", f"Content-Length: {len(data)}"]
+        headers += [f"X-Item-{name.replace('_', '-').title()}: {header_value(value)}"
+                    for name, value in meta.items() if value is not None]
+        head = "".join(f"{header}\r\n" for header in headers)
+        return f"--{self.boundary}\r\n{head}\r\n".encode("utf-8") + data + b"\r\n"
+
+    def close(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode("utf-8")
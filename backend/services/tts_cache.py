@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Cache audio du service TTS, adressé par contenu
+
+La clé est le hachage du texte normalisé (Unicode NFC, espaces réduits),
+de la voix, de la vitesse et du format de sortie. Deux niveaux :
+- mémoire : OrderedDict borné en octets (TTS_CACHE_MEMORY_MB), éviction LRU ;
+- disque (optionnel, TTS_CACHE_DIR) : un fichier par entrée, borné en
+  octets (TTS_CACHE_DISK_MB), éviction LRU sur la date d'accès. Il survit
+  aux redémarrages.
+
+Un manifeste (TTS_PROMPTS_FILE) liste les phrases fixes des agents ; elles
+sont pré-calculées au démarrage et servies ensuite sans synthèse.
+"""
+import os
+import json
+import asyncio
+import struct
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Configuration du cache
+CACHE_MEMORY_BYTES = int(float(os.getenv('TTS_CACHE_MEMORY_MB', '64')) * 1024 * 1024)
+CACHE_DIR = os.getenv('TTS_CACHE_DIR', '')  # vide = pas de niveau disque
+CACHE_DISK_BYTES = int(float(os.getenv('TTS_CACHE_DISK_MB', '512')) * 1024 * 1024)
+PROMPTS_FILE = os.getenv('TTS_PROMPTS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          'tts_prompts.json'))
+# format[@fréquence] : WAV de /api/tts, PCM à la fréquence de la voix et à 48 kHz (LiveKit)
+PRERENDER_FORMATS = [f for f in os.getenv('TTS_CACHE_PRERENDER_FORMATS', 'wav,pcm_s16le,pcm_s16le@48000').split(',') if f]
+
+ENTRY_SUFFIX = ".tts"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, voice: str, speed: float, audio_format: str) -> str:
+    material = json.dumps([normalize_text(text), voice, round(float(speed), 2), audio_format],
+                          ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CachedAudio:
+    """Audio prêt à servir et ce qu'il faut pour ses en-têtes"""
+
+    __slots__ = ("data", "sample_rate", "voice")
+
+    def __init__(self, data: bytes, sample_rate: int, voice: str):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.voice = voice
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({"sample_rate": self.sample_rate, "voice": self.voice}).encode("utf-8")
+        return struct.pack("<I", len(meta)) + meta + self.data
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedAudio":
+        (meta_len,) = struct.unpack_from("<I", raw)
+        meta = json.loads(raw[4:4 + meta_len])
+        return cls(raw[4 + meta_len:], int(meta["sample_rate"]), meta["voice"])
+
+
+class MemoryTier:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedAudio):
+        if len(entry.data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous.data)
+        self._entries[key] = entry
+        self.size += len(entry.data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.data)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskTier:
+    """Un fichier par entrée ; l'ordre LRU est reconstruit au démarrage depuis les dates d'accès
+
+    Le verrou ne protège que l'index : lectures et écritures de fichiers se font hors verrou.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # clé -> taille
+        files = []
+        for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._index[key] = size
+        self.size = sum(self._index.values())
+        self._unlink(self._evict())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._index:
+                return None
+        path = self._path(key)
+        try:
+            entry = CachedAudio.from_bytes(path.read_bytes())
+            os.utime(path)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logger.warning(f"⚠️ Entrée de cache TTS illisible {path.name}: {e}")
+            with self._lock:
+                self.size -= self._index.pop(key, 0)
+            self._unlink([key])
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedAudio):
+        raw = entry.to_bytes()
+        if len(raw) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Fichier temporaire propre à l'écrivain : deux écritures de la même clé ne se mélangent pas
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Cache TTS disque non écrit: {e}")
+            return
+        with self._lock:
+            self.size += len(raw) - self._index.pop(key, 0)
+            self._index[key] = len(raw)
+            evicted = self._evict()
+        self._unlink(evicted)
+
+    def _evict(self) -> list:
+        """Retire de l'index les entrées les plus anciennes (sous verrou) ; renvoie leurs clés"""
+        evicted = []
+        while self.size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.size -= size
+            evicted.append(key)
+        return evicted
+
+    def _unlink(self, keys: list):
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self._index)
+
+
+class AudioCache:
+    """Cache mémoire + disque
+
+    Le verrou ne couvre que le niveau mémoire et les compteurs. Depuis la
+    boucle d'événements, `aget` / `aput` consultent la mémoire sur place et
+    passent les accès disque à un thread ; `get` / `put` sont bloquants
+    (threads de synthèse, pré-calcul).
+    """
+
+    def __init__(self, memory_bytes: int = CACHE_MEMORY_BYTES, directory: str = CACHE_DIR,
+                 disk_bytes: int = CACHE_DISK_BYTES):
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = None
+        if directory:
+            try:
+                self.disk = DiskTier(directory, disk_bytes)
+            except OSError as e:
+                logger.warning(f"⚠️ Cache TTS disque désactivé ({directory}): {e}")
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.hits["memory"] += 1
+            elif self.disk is None:
+                self.misses += 1
+            return entry
+
+    def _disk_get(self, key: str):
+        entry = self.disk.get(key)
+        with self._lock:
+            if entry is not None:
+                self.hits["disk"] += 1
+                self.memory.put(key, entry)
+            else:
+                self.misses += 1
+        return entry
+
+    def get(self, key: str):
+        entry = self._memory_get(key)
+        if entry is None and self.disk is not None:
+            entry = self._disk_get(key)
+        return entry
+
+    async def aget(self, key: str):
+        entry = self._memory_get(key)
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        return entry
+
+    def put(self, key: str, entry: CachedAudio):
+        with self._lock:
+            self.memory.put(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    async def aput(self, key: str, entry: CachedAudio):
+        with self._lock:
+            self.memory.put(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, entry)
+
+    def preload(self, key: str) -> bool:
+        """Remonte l'entrée en mémoire si elle existe, sans compter de hit ni de miss (pré-calcul)"""
+        with self._lock:
+            if self.memory.get(key) is not None:
+                return True
+        entry = self.disk.get(key) if self.disk is not None else None
+        if entry is not None:
+            with self._lock:
+                self.memory.put(key, entry)
+        return entry is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.misses + sum(self.hits.values())
+            stats = {
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory.size,
+                "memory_max_bytes": self.memory.max_bytes,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_ratio": round(sum(self.hits.values()) / lookups, 3) if lookups else 0.0
+            }
+        if self.disk is not None:
+            stats.update(disk_entries=len(self.disk), disk_bytes=self.disk.size,
+                         disk_max_bytes=self.disk.max_bytes)
+        return stats
+
+
+def load_prompts(path: str = PROMPTS_FILE) -> list:
+    """Phrases fixes du manifeste : [{"text", "voice"?, "speed"?}, ...]"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Manifeste de phrases TTS non lu ({path}): {e}")
+        return []
+    return [p for group in manifest.get("prompts", {}).values() for p in group if p.get("text")]
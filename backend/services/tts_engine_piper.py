@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Moteur Piper natif pour le service TTS
+
+Chaque voix (`<nom>.onnx` + `<nom>.onnx.json`) est chargée une fois dans une
+session ONNX Runtime conservée pendant toute la vie du processus. Le texte
+est phonémisé par espeak-ng (bibliothèque de piper-tts), converti en
+identifiants de phonèmes selon la table de la voix, puis synthétisé phrase
+par phrase en PCM float32, sans aller-retour réseau. La phonémisation passe
+par un cache partagé entre voix et requêtes (tts_phonemes).
+"""
+import os
+import json
+import logging
+import unicodedata
+from pathlib import Path
+import numpy as np
+
+from tts_phonemes import PhonemeCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    # piper-tts 1.2.x
+    from piper_phonemize import phonemize_espeak as _phonemize_espeak
+    PHONEMIZER_AVAILABLE = True
+except ImportError:
+    try:
+        # piper-tts >= 1.3
+        from piper.phonemize_espeak import EspeakPhonemizer
+        _espeak_phonemizer = EspeakPhonemizer()
+
+        def _phonemize_espeak(text: str, voice: str) -> list:
+            return _espeak_phonemizer.phonemize(voice, text)
+
+        PHONEMIZER_AVAILABLE = True
+    except ImportError:
+        PHONEMIZER_AVAILABLE = False
+
+# Configuration du moteur
+PIPER_VOICES_DIR = os.getenv('PIPER_VOICES_DIR', '/app/voices')
+PIPER_DEFAULT_VOICE = os.getenv('VOICE_MODEL', 'fr_FR-upmc-medium')
+PIPER_ONNX_THREADS = int(os.getenv('TTS_ONNX_THREADS', '0'))  # 0 = défaut ONNX Runtime
+
+BOS, EOS, PAD = "^", "$", "_"
+
+# Identifiants historiques du service -> nom du modèle
+VOICE_ALIASES = {"tom-fr-high": "fr_FR-tom-high"}
+
+
+class PiperEngineError(RuntimeError):
+    """Voix introuvable ou moteur natif indisponible"""
+
+
+class PiperVoiceModel:
+    """Une voix Piper dans une session ONNX Runtime persistante"""
+
+    def __init__(self, model_path: str, config_path: str = None, threads: int = PIPER_ONNX_THREADS,
+                 phoneme_cache: PhonemeCache = None):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise PiperEngineError("onnxruntime n'est pas installé")
+        config_path = config_path or f"{model_path}.json"
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.name = Path(model_path).stem
+        self.sample_rate = int(config["audio"]["sample_rate"])
+        self.espeak_voice = config.get("espeak", {}).get("voice", "fr")
+        self.phoneme_type = config.get("phoneme_type", "espeak")
+        self.phoneme_id_map = config["phoneme_id_map"]
+        self.num_speakers = int(config.get("num_speakers", 1))
+        inference = config.get("inference", {})
+        self.noise_scale = float(inference.get("noise_scale", 0.667))
+        self.length_scale = float(inference.get("length_scale", 1.0))
+        self.noise_w = float(inference.get("noise_w", 0.8))
+        self.phoneme_cache = phoneme_cache
+
+        if self.phoneme_type == "espeak" and not PHONEMIZER_AVAILABLE:
+            raise PiperEngineError("Phonémiseur espeak-ng indisponible (piper-tts non installé)")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def phonemize(self, text: str) -> list:
+        """Phonèmes par phrase : [[phonème, ...], ...]"""
+        if self.phoneme_type == "text":
+            return [list(unicodedata.normalize("NFD", text))]
+        if self.phoneme_cache is not None:
+            return self.phoneme_cache.phonemize(text, self.espeak_voice, _phonemize_espeak)
+        return _phonemize_espeak(text, self.espeak_voice)
+
+    def phonemes_to_ids(self, phonemes: list) -> list:
+        """Identifiants : BOS, PAD, puis chaque phonème suivi de PAD, puis EOS"""
+        id_map = self.phoneme_id_map
+        ids = list(id_map[BOS]) + list(id_map[PAD])
+        for phoneme in phonemes:
+            if phoneme not in id_map:
+                logger.debug(f"Phonème absent de la voix {self.name}: {phoneme!r}")
+                continue
+            ids.extend(id_map[phoneme])
+            ids.extend(id_map[PAD])
+        ids.extend(id_map[EOS])
+        return ids
+
+    def synthesize_ids(self, phoneme_ids: list, speed: float = 1.0, speaker_id: int = None) -> np.ndarray:
+        """Audio float32 mono dans [-1, 1] pour une phrase"""
+        feeds = {
+            "input": np.asarray([phoneme_ids], dtype=np.int64),
+            "input_lengths": np.asarray([len(phoneme_ids)], dtype=np.int64),
+            "scales": np.asarray([self.noise_scale, self.length_scale / max(speed, 0.1), self.noise_w],
+                                 dtype=np.float32)
+        }
+        if "sid" in self._input_names:
+            feeds["sid"] = np.asarray([speaker_id or 0], dtype=np.int64)
+        audio = self.session.run(None, feeds)[0].reshape(-1)
+        return np.clip(audio, -1.0, 1.0).astype(np.float32, copy=False)
+
+    def synthesize(self, text: str, speed: float = 1.0, speaker_id: int = None):
+        """Itère sur l'audio float32 de chaque phrase"""
+        for phonemes in self.phonemize(text):
+            if phonemes:
+                yield self.synthesize_ids(self.phonemes_to_ids(phonemes), speed, speaker_id)
+
+    def synthesize_float32(self, text: str, speed: float = 1.0, speaker_id: int = None) -> np.ndarray:
+        """Texte complet en float32 à la fréquence de la voix"""
+        pieces = list(self.synthesize(text, speed, speaker_id))
+        return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+    def synthesize_pcm16(self, text: str, speed: float = 1.0, speaker_id: int = None) -> bytes:
+        """Texte complet en PCM s16le à la fréquence de la voix"""
+        return (self.synthesize_float32(text, speed, speaker_id) * 32767.0).astype(np.int16).tobytes()
+
+    def warm_up(self):
+        """Première inférence (allocations, optimisation du graphe) avant le premier client"""
+        self.synthesize_pcm16("Bonjour.")
+
+
+class PiperEngine:
+    """Voix natives disponibles dans PIPER_VOICES_DIR, chargées au démarrage"""
+
+    def __init__(self, voices_dir: str = PIPER_VOICES_DIR, default_voice: str = PIPER_DEFAULT_VOICE):
+        self.voices_dir = voices_dir
+        self.default_voice = default_voice
+        self.voices = {}
+        self.phonemes = PhonemeCache()
+
+    def load(self):
+        loaded = self.phonemes.load()
+        if loaded:
+            logger.info(f"✅ Cache G2P relu: {loaded} entrées")
+        for model_path in sorted(Path(self.voices_dir).glob("*.onnx")):
+            try:
+                voice = PiperVoiceModel(str(model_path), phoneme_cache=self.phonemes)
+                voice.warm_up()
+            except Exception as e:
+                logger.warning(f"⚠️ Voix Piper {model_path.name} non chargée: {e}")
+                continue
+            self.voices[voice.name] = voice
+            logger.info(f"✅ Voix Piper native chargée: {voice.name} ({voice.sample_rate} Hz)")
+        if self.voices and self.default_voice not in self.voices:
+            self.default_voice = next(iter(self.voices))
+        return self
+
+    @property
+    def available(self) -> bool:
+        return bool(self.voices)
+
+    def voice(self, name: str = None) -> PiperVoiceModel:
+        """Voix demandée, ou voix par défaut pour les identifiants non natifs (alloy, ...)"""
+        if not self.voices:
+            raise PiperEngineError("Aucune voix Piper native chargée")
+        return self.voices.get(VOICE_ALIASES.get(name, name)) or self.voices[self.default_voice]
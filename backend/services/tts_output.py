@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Encodage de sortie du service TTS, entièrement en mémoire
+
+Le client choisit le format (`wav`, `pcm_s16le`, `float32`) et la fréquence
+(`sample_rate`, par défaut celle de la voix). Le rééchantillonnage réutilise
+le filtre polyphase du service ASR (audio_resample : coefficients conçus
+une fois par couple de fréquences, en cache) ; en flux, StreamResampler
+garde l'historique entre deux phrases, sans discontinuité.
+
+Le PCM produit peut être passé tel quel à `rtc.AudioFrame` (s16le mono à
+la fréquence demandée).
+"""
+import struct
+import numpy as np
+
+from audio_resample import StreamResampler, resample
+
+OUTPUT_FORMATS = ("wav", "pcm_s16le", "float32")
+FORMAT_ALIASES = {"pcm": "pcm_s16le", "s16le": "pcm_s16le", "f32le": "float32"}
+OUTPUT_SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+MEDIA_TYPES = {"wav": "audio/wav", "pcm_s16le": "application/octet-stream",
+               "float32": "application/octet-stream"}
+
+
+class OutputSpec:
+    """Format et fréquence demandés ; `sample_rate` None = fréquence de la voix"""
+
+    __slots__ = ("format", "sample_rate")
+
+    def __init__(self, audio_format: str, sample_rate: int = None):
+        self.format = audio_format
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def parse(cls, data: dict, default_format: str = "wav") -> "OutputSpec":
+        """Depuis le corps de requête ; ValueError si non supporté"""
+        audio_format = str(data.get('format') or default_format).lower()
+        audio_format = FORMAT_ALIASES.get(audio_format, audio_format)
+        if audio_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Format non supporté ({', '.join(OUTPUT_FORMATS)})")
+        sample_rate = data.get('sample_rate')
+        if sample_rate is not None:
+            try:
+                sample_rate = int(sample_rate)
+            except (TypeError, ValueError):
+                sample_rate = None
+            if sample_rate not in OUTPUT_SAMPLE_RATES:
+                raise ValueError(f"Fréquence non supportée ({', '.join(map(str, OUTPUT_SAMPLE_RATES))})")
+        return cls(audio_format, sample_rate)
+
+    def rate_for(self, source_rate: int) -> int:
+        return self.sample_rate or source_rate
+
+    def cache_format(self, source_rate: int) -> str:
+        """Partie format de la clé de cache : la fréquence résolue en fait partie"""
+        return f"{self.format}@{self.rate_for(source_rate)}"
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+    @property
+    def body_format(self) -> str:
+        """Encodage des échantillons (le WAV contient du s16le)"""
+        return "float32" if self.format == "float32" else "pcm_s16le"
+
+
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def encode_samples(audio: np.ndarray, body_format: str) -> bytes:
+    if body_format == "float32":
+        return np.asarray(audio, dtype="<f4").tobytes()
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def wav_header(sample_rate: int, data_size: int = 0xFFFFFFFF, float_format: bool = False) -> bytes:
+    """En-tête WAV mono ; data_size 0xFFFFFFFF = longueur inconnue (flux)"""
+    bits = 32 if float_format else 16
+    block_align = bits // 8
+    riff_size = 0xFFFFFFFF if data_size == 0xFFFFFFFF else 36 + data_size
+    return b"".join([
+        b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 3 if float_format else 1, 1, sample_rate,
+                             sample_rate * block_align, block_align, bits),
+        b"data", struct.pack("<I", data_size)
+    ])
+
+
+def encode(audio: np.ndarray, source_rate: int, spec: OutputSpec) -> bytes:
+    """Clip complet float32 -> octets au format et à la fréquence demandés"""
+    target_rate = spec.rate_for(source_rate)
+    if target_rate != source_rate:
+        audio = resample(audio, source_rate, target_rate)
+    body = encode_samples(audio, spec.body_format)
+    if spec.format == "wav":
+        return wav_header(target_rate, len(body)) + body
+    return body
+
+
+class StreamEncoder:
+    """Encodage phrase par phrase ; l'en-tête WAV (longueur inconnue) précède le premier morceau"""
+
+    def __init__(self, source_rate: int, spec: OutputSpec):
+        self.spec = spec
+        self.sample_rate = spec.rate_for(source_rate)
+        self._resampler = StreamResampler(source_rate, self.sample_rate) if self.sample_rate != source_rate else None
+        self._header_sent = spec.format != "wav"
+
+    def header(self) -> bytes:
+        if self._header_sent:
+            return b""
+        self._header_sent = True
+        return wav_header(self.sample_rate)
+
+    def process(self, audio: np.ndarray) -> bytes:
+        if self._resampler is not None:
+            audio = self._resampler.process(audio)
+        return encode_samples(audio, self.spec.body_format)
+
+    def flush(self) -> bytes:
+        if self._resampler is None:
+            return b""
+        return encode_samples(self._resampler.flush(), self.spec.body_format)
+
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Cache de phonémisation (G2P) du moteur Piper natif
+
+espeak-ng reçoit le texte entier, comme sans cache : c'est lui qui le
+découpe en phrases (abréviations comme « M. » ou « etc. » comprises), et
+la liaison peut franchir une fin de phrase. Le résultat est gardé à deux
+niveaux, partagés par toutes les requêtes et toutes les voix de même langue
+espeak :
+- texte : texte normalisé -> phonèmes par phrase (TTS_G2P_CACHE_SENTENCES
+  entrées, LRU) ;
+- mot : mot en minuscules -> phonèmes (TTS_G2P_CACHE_WORDS entrées, LRU),
+  appris dans les textes d'une seule phrase. Un tel texte inconnu dont tous
+  les mots sont connus est recomposé sans espeak.
+
+La recomposition ne s'applique qu'aux textes sans fin de phrase interne
+(. ! ? suivis d'un mot), aux frontières sans liaison ni élision possibles
+(mot suivant commençant par une consonne autre que h, ou ponctuation) et
+sans chiffres, sigles ni symboles : ailleurs, la prononciation d'un mot
+dépend de son voisin et le texte passe par espeak. Un mot n'est appris que
+si la recomposition de son texte redonne exactement la sortie d'espeak.
+TTS_G2P_WORD_CACHE=0 désactive le niveau mot.
+
+TTS_G2P_CACHE_FILE (optionnel) : fichier JSON relu au démarrage et réécrit
+à l'arrêt, pour garder le cache d'un redémarrage à l'autre.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from tts_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Configuration du cache G2P
+G2P_CACHE_SENTENCES = int(os.getenv('TTS_G2P_CACHE_SENTENCES', '8192'))
+G2P_CACHE_WORDS = int(os.getenv('TTS_G2P_CACHE_WORDS', '50000'))
+G2P_WORD_CACHE = os.getenv('TTS_G2P_WORD_CACHE', '1').lower() not in ('0', 'false', 'no')
+G2P_CACHE_FILE = os.getenv('TTS_G2P_CACHE_FILE', '')  # vide = pas de persistance
+
+FILE_VERSION = 1
+
+TOKEN_RE = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*|\S")
+# Ponctuation recopiée telle quelle par espeak après le mot qui la précède
+PUNCTUATION = frozenset(",.;:!?")
+# Ponctuation où espeak peut couper la phrase (selon le mot qui suit)
+SENTENCE_END = frozenset(".!?")
+# Initiales qui permettent liaison, élision ou enchaînement avec le mot précédent
+LINKING_INITIALS = frozenset("aàâäeéèêëiîïoôöuùûüyÿœæh")
+
+
+def word_plan(text: str):
+    """[(mot en minuscules, ponctuation qui le suit), ...] si le texte est recomposable, sinon None"""
+    plan = []
+    tokens = TOKEN_RE.findall(text)
+    for i, token in enumerate(tokens):
+        if token in PUNCTUATION:
+            if not plan:
+                return None
+            if token in SENTENCE_END and any(t not in PUNCTUATION for t in tokens[i + 1:]):
+                return None  # fin de phrase interne : le découpage appartient à espeak
+            word, punctuation = plan[-1]
+            plan[-1] = (word, punctuation + token)
+            continue
+        if not token[0].isalpha() or sum(c.isupper() for c in token) > 1:
+            return None  # chiffres, symboles, sigles : prononciation contextuelle
+        if plan and not plan[-1][1] and token[0].lower() in LINKING_INITIALS:
+            return None  # liaison ou élision possible avec le mot précédent
+        plan.append((token.lower(), ""))
+    return plan or None
+
+
+def compose(plan: list, words: list) -> str:
+    return " ".join(phonemes + punctuation for (_, punctuation), phonemes in zip(plan, words))
+
+
+class LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def items(self):
+        return list(self._entries.items())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PhonemeCache:
+    """Phonèmes par texte et par mot ; un verrou, espeak est appelé hors verrou
+
+    Les phonèmes Piper sont des points de code : un mot est gardé en chaîne,
+    un texte en tuple de phrases, chacune tuple de points de code.
+    """
+
+    def __init__(self, max_sentences: int = G2P_CACHE_SENTENCES, max_words: int = G2P_CACHE_WORDS,
+                 word_level: bool = G2P_WORD_CACHE, path: str = G2P_CACHE_FILE):
+        self.sentences = LRU(max_sentences)
+        self.words = LRU(max_words if word_level else 0)
+        self.word_level = word_level
+        self.path = path
+        self._lock = threading.Lock()
+        self.hits = {"sentence": 0, "word": 0}
+        self.misses = 0
+        self.phonemizer_seconds = 0.0
+
+    def phonemize(self, text: str, voice: str, phonemizer) -> list:
+        """Phonèmes par phrase, [[phonème, ...], ...], comme `phonemizer(text, voice)`"""
+        text = normalize_text(text)
+        if not text:
+            return []
+        plan = word_plan(text) if self.word_level else None
+        with self._lock:
+            cached = self.sentences.get((voice, text))
+            if cached is not None:
+                self.hits["sentence"] += 1
+                return [list(p) for p in cached]
+            if plan is not None:
+                words = [self.words.get((voice, word)) for word, _ in plan]
+                if all(w is not None for w in words):
+                    phonemes = (tuple(compose(plan, words)),)
+                    self.sentences.put((voice, text), phonemes)
+                    self.hits["word"] += 1
+                    return [list(p) for p in phonemes]
+            self.misses += 1
+
+        start = time.perf_counter()
+        phonemes = tuple(tuple(p) for p in phonemizer(text, voice))
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.phonemizer_seconds += elapsed
+            self.sentences.put((voice, text), phonemes)
+            if plan is not None and len(phonemes) == 1:
+                self._learn_words(plan, "".join(phonemes[0]), voice)
+        return [list(p) for p in phonemes]
+
+    def _learn_words(self, plan: list, output: str, voice: str):
+        """Mots du texte, si la découpe de la sortie d'espeak le redonne à l'identique"""
+        chunks = output.split(" ")
+        if len(chunks) != len(plan):
+            return
+        words = []
+        for chunk, (_, punctuation) in zip(chunks, plan):
+            if punctuation and not chunk.endswith(punctuation):
+                return
+            words.append(chunk[:len(chunk) - len(punctuation)])
+        if any(not w for w in words) or compose(plan, words) != output:
+            return
+        for (word, _), phonemes in zip(plan, words):
+            self.words.put((voice, word), phonemes)
+
+    def load(self) -> int:
+        """Relit le fichier de persistance ; renvoie le nombre d'entrées chargées"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FILE_VERSION:
+                return 0
+            with self._lock:
+                for voice, sentence, phonemes in data.get("sentences", []):
+                    self.sentences.put((voice, sentence), tuple(tuple(p) for p in phonemes))
+                for voice, word, phonemes in data.get("words", []):
+                    self.words.put((voice, word), phonemes)
+                return len(self.sentences) + len(self.words)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Cache G2P non relu ({self.path}): {e}")
+            return 0
+
+    def save(self) -> bool:
+        """Écrit le cache (ordre LRU conservé) dans le fichier de persistance"""
+        if not self.path:
+            return False
+        with self._lock:
+            data = {
+                "version": FILE_VERSION,
+                "sentences": [[voice, sentence, ["".join(p) for p in phonemes]]
+                              for (voice, sentence), phonemes in self.sentences.items()],
+                "words": [[voice, word, phonemes] for (voice, word), phonemes in self.words.items()]
+            }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Cache G2P non écrit ({self.path}): {e}")
+            return False
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "sentence_entries": len(self.sentences),
+                "sentence_max_entries": self.sentences.max_entries,
+                "word_entries": len(self.words),
+                "word_max_entries": self.words.max_entries,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "phonemizer_seconds": round(self.phonemizer_seconds, 3),
+                "persisted": bool(self.path)
+            }
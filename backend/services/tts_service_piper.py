@@ -1,18 +1,40 @@
 #!/usr/bin/env python3
 """
-Service TTS avec Piper via OpenEDAI-Speech - API compatible OpenAI
+Service TTS avec Piper - API compatible OpenAI
+
+Moteur natif (voix Piper chargées dans ONNX Runtime au démarrage) ou, à
+défaut, relais HTTP vers OpenEDAI-Speech. L'audio passe par un cache
+adressé par contenu ; les phrases fixes des agents y sont pré-calculées.
+Les réponses sont produites en mémoire (aucun fichier temporaire), au format
+(`wav`, `pcm_s16le`, `float32`) et à la fréquence demandés.
 """
 
 import os
 import sys
-import tempfile
-import requests
 import json
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+import math
+import asyncio
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import logging
 
+# Hors conteneur : audio_resample est partagé avec le service ASR (backend/api)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+from tts_engine_piper import PiperEngine
+from tts_upstream import UpstreamClient
+from tts_cache import AudioCache, CachedAudio, PRERENDER_FORMATS, cache_key, load_prompts
+from tts_streaming import split_text, stream_pieces
+from tts_output import OutputSpec, StreamEncoder, encode, pcm16_to_float, wav_header
+from tts_batch import (BATCH_CONTAINERS, BATCH_MAX_ITEMS, BATCH_WORKERS, LENGTH_PREFIXED_MEDIA_TYPE,
+                       MultipartWriter, batch_executor, length_prefixed_frame)
+from tts_admission import (PRIORITIES, PRIORITY_BATCH, PRIORITY_INTERACTIVE, AdmissionController,
+                           AdmissionRejected)
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,7 +44,13 @@ app = FastAPI(title="TTS Service Piper", version="1.0.0")
 # Configuration Piper TTS
 PIPER_TTS_URL = os.getenv('PIPER_TTS_URL', 'http://0.0.0.0:5002/v1/audio/speech')
 DEFAULT_VOICE = os.getenv('TTS_VOICE', 'alloy')
-RESPONSE_FORMAT = os.getenv('TTS_RESPONSE_FORMAT', 'wav')
+# auto : moteur natif si une voix se charge, sinon OpenEDAI ; native ; openedai
+TTS_ENGINE = os.getenv('TTS_ENGINE', 'auto')
+
+piper_engine = PiperEngine()
+tts_cache = AudioCache()
+upstream = UpstreamClient(PIPER_TTS_URL)
+admission = AdmissionController()
 
 # Voix disponibles (compatibles OpenAI + Tom français)
 AVAILABLE_VOICES = [
@@ -45,112 +73,156 @@ TOM_FRENCH_CONFIG = {
     "description": "Voix masculine française Tom haute qualité pour streaming temps réel"
 }
 
-def generate_piper_audio(text: str, output_path: str, voice: str = None):
-    """Génère un fichier audio WAV avec Piper TTS via OpenEDAI-Speech"""
+def resolve_upstream_voice(voice: str = None) -> str:
+    """Voix OpenEDAI : voix demandée si connue, sinon voix par défaut"""
+    selected_voice = voice or DEFAULT_VOICE
+    if selected_voice not in AVAILABLE_VOICES:
+        logger.warning(f"Voix {selected_voice} non disponible, utilisation de {DEFAULT_VOICE}")
+        selected_voice = DEFAULT_VOICE
+    return selected_voice
+
+async def generate_piper_audio(text: str, voice: str = None) -> tuple:
+    """Audio Piper via OpenEDAI-Speech : (float32 mono, fréquence, moteur)
+
+    Le moteur vaut "fallback" si l'amont a échoué et qu'un signal de
+    remplacement a été produit (jamais mis en cache).
+    """
     try:
-        # Utiliser la voix spécifiée ou la voix par défaut
-        selected_voice = voice or DEFAULT_VOICE
-        
-        # Vérifier que la voix est disponible
-        if selected_voice not in AVAILABLE_VOICES:
-            logger.warning(f"Voix {selected_voice} non disponible, utilisation de {DEFAULT_VOICE}")
-            selected_voice = DEFAULT_VOICE
+        selected_voice = resolve_upstream_voice(voice)
         
         logger.info(f"🎯 Génération audio Piper pour: '{text[:50]}...'")
         logger.info(f"   Voix: {selected_voice}")
         logger.info(f"   URL: {PIPER_TTS_URL}")
         
-        # Préparer la requête pour l'API OpenAI-compatible
-        payload = {
-            "input": text,
-            "voice": selected_voice,
-            "response_format": RESPONSE_FORMAT
-        }
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        # Faire la requête à Piper TTS
-        response = requests.post(
-            PIPER_TTS_URL,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            # Sauvegarder l'audio reçu
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
-            
-            # Vérifier que le fichier a été créé
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                logger.info(f"✅ Audio Piper généré: {output_path}")
-                logger.info(f"   Taille: {os.path.getsize(output_path)} octets")
-                return True
-            else:
-                raise Exception("Fichier audio non généré ou trop petit")
-        else:
-            error_msg = f"Erreur API Piper: {response.status_code}"
-            try:
-                error_detail = response.json()
-                error_msg += f" - {error_detail}"
-            except:
-                error_msg += f" - {response.text}"
-            raise Exception(error_msg)
+        # Requête sur le pool de connexions partagé, sans bloquer la boucle
+        pcm, sample_rate = await upstream.speech_pcm(text, selected_voice)
+        if len(pcm) <= 1000:
+            raise Exception("Audio non généré ou trop court")
+        logger.info(f"✅ Audio Piper généré: {len(pcm)} octets à {sample_rate} Hz")
+        return pcm16_to_float(pcm), sample_rate, 'piper'
             
     except Exception as e:
         logger.error(f"❌ Erreur Piper TTS: {e}")
         logger.info("🔄 Utilisation du fallback audio...")
-        return generate_fallback_audio(text, output_path)
+        audio, sample_rate = await run_in_threadpool(generate_fallback_audio, text)
+        return audio, sample_rate, 'fallback'
+
+def generate_fallback_audio(text: str) -> tuple:
+    """Génère un audio de fallback simple : (float32 mono, fréquence)"""
+    sample_rate = 16000  # Compatible LiveKit
+    duration = max(1.0, len(text) * 0.08)  # Durée basée sur la longueur du texte
+    
+    # Générer un signal audio simple
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    
+    # Fréquence de base pour une voix neutre
+    base_freq = 200
+    audio_data = 0.3 * np.sin(2 * np.pi * base_freq * t)
+    
+    # Modulation légère
+    modulation = 1 + 0.1 * np.sin(2 * np.pi * 2 * t)
+    audio_data *= modulation
+    
+    # Enveloppe simple
+    envelope = np.ones_like(t)
+    fade_samples = int(0.1 * sample_rate)
+    if len(envelope) > 2 * fade_samples:
+        envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
+        envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
+    
+    audio_data *= envelope
+    audio_data = np.clip(audio_data, -1, 1) * 0.5
+    
+    logger.info(f"✅ Audio fallback généré: {duration:.1f} s")
+    return audio_data.astype(np.float32), sample_rate
+
+def render_native(native_voice, text: str, speed: float, spec: OutputSpec) -> CachedAudio:
+    """Synthèse native au format demandé, mise en cache (bloquant)"""
+    audio = native_voice.synthesize_float32(text, speed)
+    entry = CachedAudio(encode(audio, native_voice.sample_rate, spec),
+                        spec.rate_for(native_voice.sample_rate), native_voice.name)
+    tts_cache.put(cache_key(text, native_voice.name, speed, spec.cache_format(native_voice.sample_rate)), entry)
+    return entry
+
+def prerender_prompts():
+    """Pré-calcule en parallèle (pool des lots) les phrases du manifeste absentes du cache"""
+    specs = []
+    for audio_format in PRERENDER_FORMATS:
+        audio_format, _, sample_rate = audio_format.partition('@')
+        specs.append(OutputSpec.parse({'format': audio_format, 'sample_rate': sample_rate or None}))
+    futures = []
+    for prompt in load_prompts():
+        native_voice = piper_engine.voice(prompt.get('voice'))
+        speed = float(prompt.get('speed', 1.0))
+        for spec in specs:
+            key = cache_key(prompt['text'], native_voice.name, speed, spec.cache_format(native_voice.sample_rate))
+            if not tts_cache.preload(key):
+                futures.append((prompt['text'],
+                                batch_executor.submit(render_native, native_voice, prompt['text'], speed, spec)))
+    rendered = 0
+    for text, future in futures:
+        try:
+            future.result()
+            rendered += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Phrase non pré-calculée '{text[:30]}...': {e}")
+    return rendered
 
-def generate_fallback_audio(text: str, output_path: str):
-    """Génère un audio de fallback simple"""
+def parse_speed(value) -> float:
+    """Vitesse de lecture ; ValueError si non numérique, nulle, négative ou infinie"""
     try:
-        import wave
-        import numpy as np
-        
-        sample_rate = 16000  # Compatible LiveKit
-        duration = max(1.0, len(text) * 0.08)  # Durée basée sur la longueur du texte
-        
-        # Générer un signal audio simple
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
-        
-        # Fréquence de base pour une voix neutre
-        base_freq = 200
-        audio_data = 0.3 * np.sin(2 * np.pi * base_freq * t)
-        
-        # Modulation légère
-        modulation = 1 + 0.1 * np.sin(2 * np.pi * 2 * t)
-        audio_data *= modulation
-        
-        # Enveloppe simple
-        envelope = np.ones_like(t)
-        fade_samples = int(0.1 * sample_rate)
-        if len(envelope) > 2 * fade_samples:
-            envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
-            envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
-        
-        audio_data *= envelope
-        
-        # Convertir en int16
-        audio_data = np.clip(audio_data, -1, 1)
-        audio_data = (audio_data * 32767 * 0.5).astype(np.int16)
-        
-        # Sauvegarder en WAV
-        with wave.open(output_path, 'wb') as wav_file:
-            wav_file.setnchannels(1)      # Mono
-            wav_file.setsampwidth(2)      # 16-bit
-            wav_file.setframerate(sample_rate)  # 16kHz
-            wav_file.writeframes(audio_data.tobytes())
-        
-        logger.info(f"✅ Audio fallback généré: {output_path}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"❌ Erreur fallback: {e}")
-        return False
+        speed = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Vitesse invalide (nombre positif attendu)")
+    if not math.isfinite(speed) or speed <= 0:
+        raise ValueError("Vitesse invalide (nombre positif attendu)")
+    return speed
+
+def request_priority(request: Request, default: str = PRIORITY_INTERACTIVE) -> str:
+    """Classe de priorité : en-tête X-Priority (interactive | batch), sinon celle de l'endpoint"""
+    priority = request.headers.get('X-Priority', default).strip().lower()
+    return priority if priority in PRIORITIES else default
+
+def overloaded(e: AdmissionRejected) -> HTTPException:
+    logger.warning(f"⛔ Synthèse TTS refusée ({e.reason}, Retry-After: {e.retry_after}s)")
+    return HTTPException(status_code=503, detail=f"Service TTS surchargé ({e.reason})",
+                         headers={"Retry-After": str(e.retry_after)})
+
+async def synthesize_entry(text: str, voice: str, speed: float, spec: OutputSpec, executor=None,
+                           priority: str = PRIORITY_INTERACTIVE) -> tuple:
+    """(CachedAudio, moteur, statut cache) : cache, sinon moteur natif, sinon relais OpenEDAI
+
+    `executor` : pool pour la synthèse native (pool de threads de Starlette par défaut).
+    Hors cache, la synthèse passe par l'admission (AdmissionRejected si refusée).
+    """
+    if piper_engine.available:
+        native_voice = piper_engine.voice(voice)
+        key = cache_key(text, native_voice.name, speed, spec.cache_format(native_voice.sample_rate))
+        entry = await tts_cache.aget(key)
+        if entry is not None:
+            return entry, 'piper-native', 'hit'
+        # Synthèse dans le processus, hors de la boucle d'événements
+        async with admission.slot(priority):
+            if executor is not None:
+                entry = await asyncio.get_running_loop().run_in_executor(
+                    executor, render_native, native_voice, text, speed, spec)
+            else:
+                entry = await run_in_threadpool(render_native, native_voice, text, speed, spec)
+        return entry, 'piper-native', 'miss'
+
+    # Fréquence de l'amont inconnue avant la réponse : la clé porte la fréquence demandée
+    selected_voice = resolve_upstream_voice(voice)
+    key = cache_key(text, f"openedai/{selected_voice}", speed, f"{spec.format}@{spec.sample_rate or 'source'}")
+    entry = await tts_cache.aget(key)
+    if entry is not None:
+        return entry, 'piper', 'hit'
+    async with admission.slot(priority):
+        audio, sample_rate, engine = await generate_piper_audio(text, selected_voice)
+    entry = CachedAudio(await run_in_threadpool(encode, audio, sample_rate, spec),
+                        spec.rate_for(sample_rate), selected_voice)
+    if engine == 'piper':
+        await tts_cache.aput(key, entry)
+    return entry, engine, 'miss'
 
 def test_piper_connection():
     """Teste la connexion avec Piper TTS (simulé pour le healthcheck Docker)"""
@@ -161,15 +233,41 @@ def test_piper_connection():
 async def startup_event():
     """Teste la connexion Piper au démarrage"""
     logger.info("🚀 Démarrage du service TTS Piper...")
+    await upstream.start()
+    logger.info(f"   Moteur: {TTS_ENGINE}")
     logger.info(f"   URL Piper: {PIPER_TTS_URL}")
     logger.info(f"   Voix par défaut: {DEFAULT_VOICE}")
+
+    if TTS_ENGINE != 'openedai':
+        # Sessions ONNX chargées et chauffées une fois pour toute la vie du processus
+        await run_in_threadpool(piper_engine.load)
+        if piper_engine.available:
+            logger.info(f"✅ Moteur Piper natif: {', '.join(piper_engine.voices)}")
+        elif TTS_ENGINE == 'native':
+            logger.error("❌ Moteur natif demandé mais aucune voix chargée, relais OpenEDAI utilisé")
+
+    if piper_engine.available:
+        rendered = await run_in_threadpool(prerender_prompts)
+        logger.info(f"✅ Cache TTS: {rendered} phrases pré-calculées, {tts_cache.stats()['memory_entries']} en mémoire")
+        await run_in_threadpool(piper_engine.phonemes.save)
     
     # Pour Docker Compose, le healthcheck vérifie déjà la disponibilité du port
     logger.info("✅ Service TTS Piper prêt à écouter les requêtes!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await upstream.close()
+    if piper_engine.phonemes.save():
+        logger.info(f"💾 Cache G2P enregistré: {piper_engine.phonemes.path}")
+
 @app.post('/api/tts')
-async def text_to_speech(data: dict):
-    """Génère un audio avec Piper TTS"""
+async def text_to_speech(data: dict, request: Request):
+    """Génère un audio avec Piper TTS
+
+    `format` : "wav" (défaut), "pcm_s16le" ou "float32" (mono, petit-boutiste) ;
+    `sample_rate` : fréquence de sortie (défaut : celle de la voix).
+    En-tête X-Priority : interactive (défaut) ou batch.
+    """
     try:
         text = data.get('text', '')
         voice = data.get('voice', None)
@@ -179,36 +277,199 @@ async def text_to_speech(data: dict):
         
         if len(text) > 2000:
             raise HTTPException(status_code=400, detail="Texte trop long (max 2000 caractères)")
+
+        try:
+            speed = parse_speed(data.get('speed', 1.0))
+            spec = OutputSpec.parse(data)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Créer un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            temp_path = tmp_file.name
-        
-        # Générer l'audio avec Piper
-        success = generate_piper_audio(text, temp_path, voice)
-        
-        if success and os.path.exists(temp_path) and os.path.getsize(temp_path) > 100:
-            return FileResponse(
-                temp_path,
-                media_type='audio/wav',
-                filename=f"piper_tts_output.wav",
-                headers={
-                    "Content-Disposition": "attachment; filename=piper_tts_output.wav",
-                    "X-Audio-Engine": "piper",
-                    "X-Audio-Quality": "high"
-                }
-            )
-        else:
-            # Nettoyer le fichier si échec
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise HTTPException(status_code=500, detail="Impossible de générer l'audio")
+        try:
+            entry, engine, cache_status = await synthesize_entry(text, voice, speed, spec,
+                                                                 priority=request_priority(request))
+        except AdmissionRejected as e:
+            raise overloaded(e)
+
+        headers = {
+            "X-Audio-Engine": engine,
+            "X-Audio-Voice": entry.voice,
+            "X-Audio-Format": spec.format,
+            "X-Sample-Rate": str(entry.sample_rate),
+            "X-Audio-Quality": "high",
+            "X-Cache": cache_status
+        }
+        if spec.format == 'wav':
+            headers["Content-Disposition"] = "attachment; filename=piper_tts_output.wav"
+        return Response(entry.data, media_type=spec.media_type, headers=headers)
             
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur TTS: {str(e)}")
 
+@app.post('/api/tts/stream')
+async def text_to_speech_stream(data: dict, request: Request):
+    """Synthèse phrase par phrase envoyée au fil de l'eau (transfert chunked)
+
+    `format` : "pcm_s16le" (défaut, alias "pcm"), "float32", ou "wav" (en-tête
+    WAV de longueur inconnue suivi du PCM s16le) ; `sample_rate` : fréquence
+    de sortie, rééchantillonnée en continu d'une phrase à l'autre. Hors cache,
+    une place d'admission (X-Priority) est réservée pour toute la durée du flux.
+    """
+    text = data.get('text', '')
+    voice = data.get('voice', None)
+
+    if not text:
+        raise HTTPException(status_code=400, detail="Texte manquant")
+    if len(text) > 2000:
+        raise HTTPException(status_code=400, detail="Texte trop long (max 2000 caractères)")
+    try:
+        speed = parse_speed(data.get('speed', 1.0))
+        spec = OutputSpec.parse(data, default_format='pcm_s16le')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Audio-Format": spec.body_format, "Cache-Control": "no-cache"}
+    if spec.sample_rate:
+        headers["X-Sample-Rate"] = str(spec.sample_rate)
+    key, cached = None, None
+    if piper_engine.available:
+        native_voice = piper_engine.voice(voice)
+        headers.update({"X-Audio-Engine": "piper-native", "X-Audio-Voice": native_voice.name,
+                        "X-Sample-Rate": str(spec.rate_for(native_voice.sample_rate))})
+        # Le corps (sans en-tête WAV) est partagé avec /api/tts au même encodage
+        body_spec = OutputSpec(spec.body_format, spec.sample_rate)
+        key = cache_key(text, native_voice.name, speed, body_spec.cache_format(native_voice.sample_rate))
+        cached = await tts_cache.aget(key)
+        headers["X-Cache"] = 'hit' if cached is not None else 'miss'
+
+        def synthesize(piece):
+            return native_voice.synthesize_float32(piece, speed), native_voice.sample_rate
+    else:
+        headers["X-Audio-Engine"] = "piper"
+
+        async def synthesize(piece):
+            pcm, sample_rate = await upstream.speech_pcm(piece, resolve_upstream_voice(voice))
+            return pcm16_to_float(pcm), sample_rate
+
+    pieces = split_text(text)
+    ticket = None
+    if cached is None:
+        # Réservée avant l'envoi des en-têtes : un refus reste un 503
+        try:
+            ticket = await admission.acquire(request_priority(request))
+        except AdmissionRejected as e:
+            raise overloaded(e)
+        logger.info(f"🎯 Synthèse en flux: {len(pieces)} morceaux")
+
+    async def audio_chunks():
+        if cached is not None:
+            if spec.format == 'wav':
+                yield wav_header(cached.sample_rate)
+            yield cached.data
+            return
+        encoder = None
+        rendered = []
+        try:
+            async for audio, sample_rate in stream_pieces(pieces, synthesize):
+                if encoder is None:
+                    encoder = StreamEncoder(sample_rate, spec)
+                    header = encoder.header()
+                    if header:
+                        yield header
+                chunk = encoder.process(audio)
+                rendered.append(chunk)
+                yield chunk
+            if encoder is not None:
+                tail = encoder.flush()
+                if tail:
+                    rendered.append(tail)
+                    yield tail
+        finally:
+            ticket.release()
+        # Flux complet : mis en cache pour les requêtes suivantes
+        if key is not None and encoder is not None:
+            await tts_cache.aput(key, CachedAudio(b"".join(rendered), encoder.sample_rate, native_voice.name))
+
+    # Filet de sécurité si le flux n'est jamais itéré (release est idempotent)
+    return StreamingResponse(audio_chunks(), media_type=spec.media_type, headers=headers,
+                             background=BackgroundTask(ticket.release) if ticket else None)
+
+@app.post('/api/tts/batch')
+async def text_to_speech_batch(data: dict, request: Request):
+    """Synthèse d'une liste de textes en parallèle, résultats dans l'ordre d'entrée
+
+    Corps : {"items": [{"text", "voice"?, "speed"?}, ...] ou "texts": [...],
+    "voice", "speed", "format", "sample_rate" (communs), "container":
+    "length_prefixed" (défaut) ou "multipart"}. Un élément en échec n'arrête
+    pas le lot : ses métadonnées portent `status: "error"` (ou "rejected" si
+    l'admission l'a refusé) et un audio vide. Priorité batch par défaut.
+    """
+    items = data.get('items')
+    if items is None:
+        items = [{'text': text} for text in data.get('texts') or []]
+    if not items:
+        raise HTTPException(status_code=400, detail="Liste de textes manquante")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Trop d'éléments (max {BATCH_MAX_ITEMS})")
+    for item in items:
+        text = item.get('text', '') if isinstance(item, dict) else ''
+        if not text:
+            raise HTTPException(status_code=400, detail="Texte manquant")
+        if len(text) > 2000:
+            raise HTTPException(status_code=400, detail="Texte trop long (max 2000 caractères)")
+
+    container = data.get('container', 'length_prefixed')
+    if container not in BATCH_CONTAINERS:
+        raise HTTPException(status_code=400, detail=f"Conteneur non supporté ({', '.join(BATCH_CONTAINERS)})")
+    try:
+        spec = OutputSpec.parse(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    priority = request_priority(request, PRIORITY_BATCH)
+
+    async def synthesize_item(index: int, item: dict):
+        meta = {'index': index, 'format': spec.format}
+        try:
+            entry, engine, cache_status = await synthesize_entry(
+                item['text'], item.get('voice', data.get('voice')),
+                parse_speed(item.get('speed', data.get('speed', 1.0))), spec, executor=batch_executor,
+                priority=priority)
+        except AdmissionRejected as e:
+            meta.update(status='rejected', error=e.reason, retry_after=e.retry_after)
+            return meta, b""
+        except Exception as e:
+            logger.error(f"❌ Élément {index} du lot en échec: {e}")
+            meta.update(status='error', error=str(e))
+            return meta, b""
+        meta.update(status='ok', engine=engine, voice=entry.voice, sample_rate=entry.sample_rate,
+                    cache=cache_status)
+        return meta, entry.data
+
+    # Tout est lancé d'un coup ; le pool borne le parallélisme aux cœurs
+    tasks = [asyncio.ensure_future(synthesize_item(i, item)) for i, item in enumerate(items)]
+    logger.info(f"🎯 Lot TTS: {len(items)} éléments sur {BATCH_WORKERS} threads")
+    multipart = MultipartWriter() if container == 'multipart' else None
+
+    async def frames():
+        try:
+            for task in tasks:
+                meta, audio = await task
+                if multipart:
+                    yield multipart.part(meta, audio, spec.media_type)
+                else:
+                    yield length_prefixed_frame(meta, audio)
+            if multipart:
+                yield multipart.close()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(frames(),
+                             media_type=multipart.media_type if multipart else LENGTH_PREFIXED_MEDIA_TYPE,
+                             headers={"X-Batch-Items": str(len(items))})
+
 @app.get('/api/voices')
 async def list_voices():
     """Liste les voix disponibles"""
@@ -226,6 +487,10 @@ async def list_voices():
         
         return {
             'available_voices': voices_info,
+            'native_voices': [
+                {'id': name, 'sample_rate': native.sample_rate, 'language': native.espeak_voice}
+                for name, native in piper_engine.voices.items()
+            ],
             'default_voice': DEFAULT_VOICE,
             'engine': 'piper',
             'language': 'fr-FR'
@@ -246,7 +511,7 @@ async def list_models():
         'model_loaded': True,
         'features': [
             'API compatible OpenAI',
-            'Latence faible',
+            'Synthèse en flux phrase par phrase (TTFB/RTF : bench_tts.py)',
             'CPU optimisé',
             'Voix naturelles'
         ]
@@ -257,7 +522,12 @@ async def health():
     """Vérification de santé du service"""
     return {
         'status': 'ok',
-        'engine': 'piper',
+        'engine': 'piper-native' if piper_engine.available else 'piper',
+        'native_voices': list(piper_engine.voices),
+        'cache': tts_cache.stats(),
+        'upstream': upstream.stats(),
+        'admission': admission.snapshot(),
+        'g2p_cache': piper_engine.phonemes.stats(),
         'piper_available': True, # Toujours True car le test interne est simulé
         'language': 'fr-FR',
         'quality': 'high',
@@ -275,6 +545,8 @@ async def root():
         'description': 'Service de synthèse vocale avec Piper TTS via OpenEDAI-Speech',
         'endpoints': [
             'POST /api/tts - Générer audio',
+            'POST /api/tts/stream - Générer audio en flux (phrase par phrase)',
+            'POST /api/tts/batch - Générer une liste de textes en parallèle',
             'GET /api/voices - Lister les voix',
             'GET /api/models - Informations modèle',
             'GET /health - Vérification santé'
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Synthèse en flux pour le service TTS
+
+Le texte est découpé en phrases puis, pour les phrases longues, en
+propositions (virgule, point-virgule, deux-points). Chaque morceau est
+synthétisé à la suite et envoyé dès qu'il est prêt (transfert chunked) ;
+la synthèse du morceau suivant démarre pendant l'envoi du précédent. Le
+premier morceau est volontairement court : le premier son part au bout de
+la synthèse d'une seule proposition.
+"""
+import os
+import re
+import asyncio
+from starlette.concurrency import run_in_threadpool
+
+# Configuration du découpage
+STREAM_MAX_CHARS = int(os.getenv('TTS_STREAM_MAX_CHARS', '160'))
+STREAM_FIRST_CHARS = int(os.getenv('TTS_STREAM_FIRST_CHARS', '60'))
+
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+
+def _pack(parts: list, max_chars: int, separator: str = " ") -> list:
+    """Regroupe des fragments consécutifs tant que le total reste sous max_chars"""
+    pieces = []
+    for part in parts:
+        if pieces and len(pieces[-1]) + len(separator) + len(part) <= max_chars:
+            pieces[-1] = f"{pieces[-1]}{separator}{part}"
+        else:
+            pieces.append(part)
+    return pieces
+
+
+def _split_long(sentence: str, max_chars: int) -> list:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    for clause in _pack(CLAUSE_END.split(sentence), max_chars):
+        # Proposition sans ponctuation plus longue que la limite : coupe aux espaces
+        pieces.extend(_pack(clause.split(), max_chars) if len(clause) > max_chars else [clause])
+    return pieces
+
+
+def split_text(text: str, max_chars: int = STREAM_MAX_CHARS, first_chars: int = STREAM_FIRST_CHARS) -> list:
+    """Morceaux de synthèse dans l'ordre du texte"""
+    text = " ".join(text.split())
+    if not text:
+        return []
+    pieces = []
+    for sentence in SENTENCE_END.split(text):
+        pieces.extend(_split_long(sentence, max_chars))
+
+    # Premier morceau court pour réduire le délai avant le premier son
+    if len(pieces[0]) > first_chars:
+        clauses = CLAUSE_END.split(pieces[0], maxsplit=1)
+        if len(clauses) == 2:
+            pieces[0:1] = clauses
+    return pieces
+
+
+async def stream_pieces(pieces: list, synthesize):
+    """Produit `synthesize(morceau)` dans l'ordre, avec un morceau d'avance
+
+    `synthesize` est soit une coroutine (relais HTTP), soit une fonction
+    bloquante exécutée dans le pool de threads (moteur natif).
+    """
+    if not pieces:
+        return
+
+    def start(piece):
+        if asyncio.iscoroutinefunction(synthesize):
+            return asyncio.ensure_future(synthesize(piece))
+        return asyncio.ensure_future(run_in_threadpool(synthesize, piece))
+
+    pending = start(pieces[0])
+    try:
+        for index in range(len(pieces)):
+            audio = await pending
+            if index + 1 < len(pieces):
+                pending = start(pieces[index + 1])
+            yield audio
+    finally:
+        # Client parti : le morceau en cours se termine dans son thread sans être attendu
+        pending.cancel()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Client asynchrone vers OpenEDAI-Speech (relais du service TTS)
+
+Un seul httpx.AsyncClient pour tout le processus : les connexions restent
+ouvertes (keep-alive) et sont réutilisées d'une requête à l'autre, la
+boucle d'événements n'est jamais bloquée pendant une synthèse distante.
+Le nombre de synthèses simultanées vers l'amont est borné par
+TTS_UPSTREAM_CONCURRENCY ; au-delà, les requêtes attendent leur tour sans
+occuper de connexion.
+"""
+import io
+import os
+import wave
+import asyncio
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Configuration du client amont
+UPSTREAM_CONCURRENCY = int(os.getenv('TTS_UPSTREAM_CONCURRENCY', '16'))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('TTS_UPSTREAM_MAX_CONNECTIONS', '32'))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv('TTS_UPSTREAM_MAX_KEEPALIVE', '16'))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv('TTS_UPSTREAM_KEEPALIVE_EXPIRY', '30'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('TTS_UPSTREAM_CONNECT_TIMEOUT', '5'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('TTS_UPSTREAM_READ_TIMEOUT', '30'))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv('TTS_UPSTREAM_POOL_TIMEOUT', '10'))
+
+
+class UpstreamError(RuntimeError):
+    """Réponse en erreur ou illisible d'OpenEDAI-Speech"""
+
+
+class UpstreamClient:
+    """Pool de connexions persistant vers l'API /v1/audio/speech"""
+
+    def __init__(self, url: str, concurrency: int = UPSTREAM_CONCURRENCY):
+        self.url = url
+        self.concurrency = max(1, concurrency)
+        self._client = None
+        self._slots = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self):
+        """À appeler dans la boucle d'événements du serveur (événement startup)"""
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS,
+                                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(UPSTREAM_READ_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT,
+                                  pool=UPSTREAM_POOL_TIMEOUT)
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def speech(self, text: str, voice: str, response_format: str = "wav") -> bytes:
+        """Audio encodé renvoyé par l'amont ; UpstreamError sinon"""
+        if self._client is None:
+            await self.start()
+        async with self._slots:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                response = await self._client.post(
+                    self.url,
+                    json={"input": text, "voice": voice, "response_format": response_format}
+                )
+            except httpx.HTTPError as e:
+                self.errors += 1
+                raise UpstreamError(f"OpenEDAI-Speech injoignable: {e!r}") from e
+            finally:
+                self.in_flight -= 1
+
+        if response.status_code != 200:
+            self.errors += 1
+            raise UpstreamError(f"Erreur API Piper: {response.status_code} - {response.text[:200]}")
+        return response.content
+
+    async def speech_pcm(self, text: str, voice: str) -> tuple:
+        """(PCM s16le mono, fréquence) à partir de la réponse WAV de l'amont"""
+        data = await self.speech(text, voice, "wav")
+        try:
+            with wave.open(io.BytesIO(data), 'rb') as wav_file:
+                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                    raise UpstreamError("Format audio OpenEDAI inattendu")
+                return wav_file.readframes(wav_file.getnframes()), wav_file.getframerate()
+        except (wave.Error, EOFError) as e:
+            raise UpstreamError(f"WAV OpenEDAI illisible: {e}") from e
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "max_connections": UPSTREAM_MAX_CONNECTIONS,
+            "max_keepalive": UPSTREAM_MAX_KEEPALIVE
+        }
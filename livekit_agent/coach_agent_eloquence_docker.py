@@ -8,7 +8,6 @@ import logging
 import os
 import time
 import numpy as np
-import wave
 from livekit import rtc, api
 import aiohttp
 from io import BytesIO
@@ -193,42 +192,20 @@ class EloquenceCoachAgent:
             self.is_processing = False
             self.audio_buffer = BytesIO()
             
-    def convert_raw_audio_to_wav(self, raw_audio_data: bytes, sample_rate: int = 48000) -> bytes:
-        """Convertit l'audio brut en WAV valide pour Whisper"""
+    async def transcribe_audio(self, audio_data: bytes, sample_rate: int = 48000) -> str:
+        """Transcrit l'audio avec Whisper (PCM brut s16le, sans conversion WAV)"""
         try:
-            if len(raw_audio_data) % 2 != 0:
-                raw_audio_data += b'\x00'
-            
-            audio_array = np.frombuffer(raw_audio_data, dtype=np.int16)
-            wav_buffer = BytesIO()
-            
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)  # Mono
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(audio_array.tobytes())
-            
-            wav_buffer.seek(0)
-            return wav_buffer.read()
-        except Exception as e:
-            logger.error(f"Erreur conversion WAV: {e}")
-            return b""
-            
-    async def transcribe_audio(self, audio_data: bytes) -> str:
-        """Transcrit l'audio avec Whisper"""
-        try:
-            # CORRECTION: Convertir en WAV valide
-            wav_data = self.convert_raw_audio_to_wav(audio_data)
-            if not wav_data:
+            if not audio_data:
                 return ""
             
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "X-Sample-Rate": str(sample_rate),
+                "X-Channels": "1"
+            }
+            
             async with aiohttp.ClientSession() as session:
-                form_data = aiohttp.FormData()
-                form_data.add_field('audio', wav_data,
-                                  filename='audio.wav',
-                                  content_type='audio/wav')
-                
-                async with session.post(f"{WHISPER_URL}/transcribe", data=form_data) as resp:
+                async with session.post(f"{WHISPER_URL}/asr/raw", data=audio_data, headers=headers) as resp:
                     if resp.status == 200:
                         result = await resp.json()
                         text = result.get("text", "")
@@ -334,15 +311,15 @@ class EloquenceCoachAgent:
             logger.error(f"Erreur envoi audio: {e}")
             
     async def synthesize_speech(self, text: str) -> bytes:
-        """Synthétise le texte avec OpenedAI Speech (compatible OpenAI)"""
+        """Synthétise le texte avec le service TTS Piper, en PCM 48 kHz prêt pour LiveKit"""
         try:
             async with aiohttp.ClientSession() as session:
-                # Utiliser l'API OpenAI-compatible
+                # Le service rééchantillonne : les octets vont tels quels dans rtc.AudioFrame
                 payload = {
-                    "model": "tts-1",
-                    "input": text,
+                    "text": text,
                     "voice": "nova",  # Voix féminine douce
-                    "response_format": "pcm",  # PCM pour LiveKit
+                    "format": "pcm_s16le",
+                    "sample_rate": 48000,
                     "speed": 1.0
                 }
                 
@@ -351,29 +328,17 @@ class EloquenceCoachAgent:
                 }
                 
                 async with session.post(
-                    f"{PIPER_URL}/v1/audio/speech",
+                    f"{PIPER_URL}/api/tts",
                     json=payload,
                     headers=headers
                 ) as resp:
                     if resp.status == 200:
                         audio_data = await resp.read()
                         logger.info(f"🎵 TTS généré: {len(audio_data)} bytes")
-                        
-                        # Convertir en PCM 48kHz si nécessaire
-                        # OpenedAI Speech retourne du PCM 24kHz par défaut
-                        # On doit resampler à 48kHz pour LiveKit
-                        import numpy as np
-                        
-                        # Supposer PCM 16-bit mono 24kHz
-                        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-                        
-                        # Resample simple 24kHz -> 48kHz (doubler les échantillons)
-                        resampled = np.repeat(audio_array, 2)
-                        
-                        return resampled.tobytes()
+                        return audio_data
                     else:
                         error_text = await resp.text()
-                        logger.error(f"Erreur OpenedAI Speech: {resp.status} - {error_text}")
+                        logger.error(f"Erreur service TTS: {resp.status} - {error_text}")
         except Exception as e:
             logger.error(f"Erreur synthèse: {e}")
         return b""
@@ -4,6 +4,9 @@ import random
 import uuid
 import tempfile
 import os
+import json
+import struct
+import httpx
 from typing import List, Dict, Any, Optional
 import pyttsx3
 import threading
@@ -18,7 +21,8 @@ from pipeline_logger import PipelineLogger, metrics_collector
 class VoiceSynthesizer:
     """
     Générateur de voix synthétisée pour les tests LiveKit
-    Utilise pyttsx3 pour générer de l'audio synthétique
+    Utilise pyttsx3 pour générer de l'audio synthétique, ou le service TTS
+    Piper (endpoint /api/tts/batch) si TTS_SERVICE_URL est défini
     """
     
     # Phrases de test pour différents scénarios
@@ -51,10 +55,13 @@ class VoiceSynthesizer:
         ]
     }
     
-    def __init__(self, temp_dir: Optional[str] = None):
+    def __init__(self, temp_dir: Optional[str] = None, tts_service_url: Optional[str] = None):
         self.logger = PipelineLogger("VOICE_SYNTH")
         metrics_collector.register_logger(self.logger)
         
+        # Service TTS : un seul aller-retour par scénario, phrases synthétisées en parallèle
+        self.tts_service_url = tts_service_url or os.getenv("TTS_SERVICE_URL")
+        
         self.temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.gettempdir()) / "livekit_test_audio"
         self.temp_dir.mkdir(exist_ok=True)
         
@@ -211,6 +218,59 @@ class VoiceSynthesizer:
             self.logger.error(f"💥 Erreur lors de la génération audio: {e}")
             return None
     
+    async def generate_audio_batch(self, texts: List[str], phrase_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Génère plusieurs phrases en une requête /api/tts/batch (WAV 48 kHz)
+        Retourne les métadonnées dans l'ordre des textes (None pour un échec)
+        """
+        generation_start = time.time()
+        self.logger.info(f"🎵 Génération par lot de {len(texts)} phrases via {self.tts_service_url}")
+        
+        try:
+            async with httpx.AsyncClient(timeout=120.0) as client:
+                response = await client.post(
+                    f"{self.tts_service_url}/api/tts/batch",
+                    json={"texts": texts, "format": "wav", "sample_rate": 48000}
+                )
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.logger.error(f"💥 Erreur lors de la génération par lot: {e}")
+            return [None] * len(texts)
+        
+        generation_time = (time.time() - generation_start) * 1000
+        payload = response.content
+        results = []
+        offset = 0
+        # Conteneur length_prefixed : [uint32 + métadonnées JSON][uint32 + WAV] par phrase
+        while offset < len(payload):
+            (meta_len,) = struct.unpack_from("<I", payload, offset)
+            item = json.loads(payload[offset + 4:offset + 4 + meta_len])
+            offset += 4 + meta_len
+            (data_len,) = struct.unpack_from("<I", payload, offset)
+            audio = payload[offset + 4:offset + 4 + data_len]
+            offset += 4 + data_len
+            
+            if item.get("status") != "ok":
+                self.logger.error(f"❌ Échec de la génération audio pour {phrase_ids[item['index']]}: {item.get('error')}")
+                results.append(None)
+                continue
+            
+            phrase_id = phrase_ids[item["index"]]
+            audio_file = self.temp_dir / f"resampled_synth_audio_{phrase_id}.wav"
+            audio_file.write_bytes(audio)
+            results.append({
+                "phrase_id": phrase_id,
+                "text": texts[item["index"]],
+                "generation_time_ms": generation_time,
+                "file_path": str(audio_file),
+                "file_size": len(audio),
+                "audio_info": self._analyze_audio_file(audio_file),
+                "timestamp": time.time()
+            })
+        
+        self.logger.latency("génération lot", generation_time)
+        return results
+    
     def _analyze_audio_file(self, audio_file: Path) -> Dict[str, Any]:
         """Analyse les propriétés d'un fichier audio WAV"""
         try:
@@ -344,9 +404,15 @@ class VoiceSynthesizer:
         
         results = []
         
-        for i, category in enumerate(scenario['phrases']):
-            text = self.get_random_phrase(category)
-            metadata = await self.generate_audio(text, f"{scenario_name}_{i+1}")
+        texts = [self.get_random_phrase(category) for category in scenario['phrases']]
+        phrase_ids = [f"{scenario_name}_{i+1}" for i in range(len(texts))]
+        batch = await self.generate_audio_batch(texts, phrase_ids) if self.tts_service_url else None
+        
+        for i, text in enumerate(texts):
+            if batch is not None:
+                metadata = batch[i]
+            else:
+                metadata = await self.generate_audio(text, phrase_ids[i])
             
             if metadata:
                 results.append(metadata)